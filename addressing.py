@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+# Address allocation per link, keyed on the pair of node types. An allocator is
+# registered once for one ordering of the pair and receives its endpoints in that
+# order whichever way round the link was created, so both sides of every link
+# come from the same rule.
+
+import ipaddress
+
+# fixed point-to-point links inside every AS; the addresses that grow with the
+# number of ASes come from the IPAM pools (ipam.py)
+P2P_NETMASK = '255.255.255.252'
+
+SPEAKER_HWADDRESS = 'bb:bb:bb:bb:bb:bb'
+
+# R <-> EXA monitor, R <-> ONOS controller and OVS <-> ONOS links
+ROUTER_MONITOR_ADDRESS = '3.0.0.1'
+MONITOR_ADDRESS = '3.0.0.2'
+ROUTER_CONTROLLER_ADDRESS = '4.0.0.2'
+CONTROLLER_ADDRESS = '4.0.0.1'
+OVS_OPENFLOW_ADDRESS = '1.0.0.2'
+CONTROLLER_OPENFLOW_ADDRESS = '1.0.0.1'
+
+
+def router_id(as_num):
+    # a.a.a.a while the ASN fits an octet, the ASN as a 32 bit address beyond
+    if as_num < 256:
+        return '{0}.{0}.{0}.{0}'.format(as_num)
+    return str(ipaddress.IPv4Address(as_num))
+
+
+class IfaceAddress(object):
+    __slots__ = ('node', 'iface', 'peer', 'address', 'netmask', 'gateway', 'hwaddress')
+
+    def __init__(self, end, peer, address, netmask, gateway=None, hwaddress=None):
+        self.node = end.node
+        self.iface = end.iface
+        self.peer = peer.node
+        self.address = address
+        self.netmask = netmask
+        self.gateway = gateway
+        self.hwaddress = hwaddress
+
+
+def host_router(ipam, host, router):
+    return (IfaceAddress(host, router, ipam.host_address(host.node_num), ipam.host_netmask(),
+                         gateway=ipam.host_gateway(host.node_num)),
+            IfaceAddress(router, host, ipam.host_gateway(router.node_num), ipam.host_netmask()))
+
+
+def host_switch(ipam, host, switch):
+    # the AS OVS bridges its host, only the host side is addressed
+    return (IfaceAddress(host, switch, ipam.host_address(host.node_num), ipam.host_netmask(),
+                         gateway=ipam.host_gateway(host.node_num)),
+            None)
+
+
+def router_router(ipam, src, dst):
+    return (IfaceAddress(src, dst, ipam.as_link_address(src.node_num, dst.node_num), ipam.as_link_netmask()),
+            IfaceAddress(dst, src, ipam.as_link_address(dst.node_num, src.node_num), ipam.as_link_netmask()))
+
+
+def router_ovs(ipam, router, ovs):
+    # an external router reaching an SDN AS, or that AS's own BGP speaker
+    hwaddress = SPEAKER_HWADDRESS if router.node_num == ovs.node_num else None
+    return (IfaceAddress(router, ovs, ipam.as_link_address(router.node_num, ovs.node_num),
+                         ipam.as_link_netmask(), hwaddress=hwaddress),
+            None)
+
+
+def router_onos(ipam, router, onos):
+    return (IfaceAddress(router, onos, ROUTER_CONTROLLER_ADDRESS, P2P_NETMASK),
+            IfaceAddress(onos, router, CONTROLLER_ADDRESS, P2P_NETMASK))
+
+
+def router_exa(ipam, router, exa):
+    return (IfaceAddress(router, exa, ROUTER_MONITOR_ADDRESS, P2P_NETMASK),
+            IfaceAddress(exa, router, MONITOR_ADDRESS, P2P_NETMASK))
+
+
+def ovs_onos(ipam, ovs, onos):
+    return (IfaceAddress(ovs, onos, OVS_OPENFLOW_ADDRESS, P2P_NETMASK),
+            IfaceAddress(onos, ovs, CONTROLLER_OPENFLOW_ADDRESS, P2P_NETMASK))
+
+
+def fabric_member(ipam, member, switch):
+    # ONOS controllers and ExaBGP monitors share one LAN over the global switch
+    return (IfaceAddress(member, switch, ipam.fabric_address(member.node), ipam.fabric_netmask()),
+            None)
+
+
+ALLOCATORS = {}
+
+
+def register(src_type, dst_type, allocator):
+    ALLOCATORS[(src_type, dst_type)] = allocator
+
+
+register('H', 'R', host_router)
+register('H', 'OVS', host_switch)
+register('R', 'R', router_router)
+register('R', 'OVS', router_ovs)
+register('R', 'ONOS', router_onos)
+register('R', 'EXA', router_exa)
+register('OVS', 'ONOS', ovs_onos)
+register('ONOS', 'Switch', fabric_member)
+register('EXA', 'Switch', fabric_member)
+
+
+def allocate(link, ipam):
+    # [IfaceAddress] for both ends of a link; links between unaddressed types yield nothing
+    allocator = ALLOCATORS.get((link.src.node_type, link.dst.node_type))
+    if allocator is not None:
+        records = allocator(ipam, link.src, link.dst)
+    else:
+        allocator = ALLOCATORS.get((link.dst.node_type, link.src.node_type))
+        if allocator is None:
+            return []
+        records = allocator(ipam, link.dst, link.src)
+    return [record for record in records if record is not None]
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+import re
+from array import array
+from bisect import bisect_left
+
+
+# role of a neighbor, as seen from the AS holding the adjacency
+UPSTREAM = 0
+BACKUP = 1
+PEER = 2
+CUSTOMER = 3
+
+ROLE_NAMES = ('upstream', 'backup', 'peer', 'customer')
+AS_RE = re.compile(r'^AS(\d+)$')
+AS_LINK_RE = re.compile(r'^AS(\d+)-AS(\d+)$')
+
+
+def link_role(rel, backup):
+    if rel == 'c2p':
+        return BACKUP if backup == 'yes' else UPSTREAM
+    elif rel == 'p2p':
+        return PEER
+    elif rel == 'p2c':
+        return CUSTOMER
+    return None
+
+
+class ASIndex(object):
+    # CSR adjacency over all ASes: the neighbors of asns[i] are
+    # neighbors[offsets[i]:offsets[i + 1]] (sorted by ASN), with their roles alongside
+
+    __slots__ = ('asns', 'offsets', 'neighbors', 'roles', 'sdn', 'exa')
+
+    def __init__(self, json_topo):
+        asns = []
+        for node in json_topo['as-nodes']:
+            r = AS_RE.match(node)
+            if r:
+                asns.append(int(r.group(1)))
+        asns.sort()
+        self.asns = array('l', asns)
+        self.sdn = array('b', [bool(json_topo['as-nodes']['AS{}'.format(asn)]['SDN']) for asn in asns])
+        self.exa = array('b', [bool(json_topo['as-nodes']['AS{}'.format(asn)]['EXA']) for asn in asns])
+
+        # one pass over the links; an explicit link wins over the reverse of its mirror
+        adjacency = {}
+        for as_link in sorted(json_topo['as-links']):
+            r = AS_LINK_RE.match(as_link)
+            if not r:
+                continue
+            src_as_num = int(r.group(1))
+            dst_as_num = int(r.group(2))
+            attrs = json_topo['as-links'][as_link]
+            adjacency.setdefault(src_as_num, {})[dst_as_num] = link_role(attrs['rel'], attrs['backup'])
+            # reverse link, never a backup from the provider side
+            dst_neighbs = adjacency.setdefault(dst_as_num, {})
+            if src_as_num not in dst_neighbs:
+                dst_neighbs[src_as_num] = link_role(attrs['rel'][::-1], 'no')
+
+        self.offsets = array('l', [0])
+        self.neighbors = array('l')
+        self.roles = array('b')
+        for asn in asns:
+            neighbs = adjacency.pop(asn, {})
+            for neighb in sorted(neighbs):
+                if neighbs[neighb] is None:
+                    continue
+                self.neighbors.append(neighb)
+                self.roles.append(neighbs[neighb])
+            self.offsets.append(len(self.neighbors))
+
+    def position(self, asn):
+        i = bisect_left(self.asns, asn)
+        if i == len(self.asns) or self.asns[i] != asn:
+            raise KeyError('AS{}'.format(asn))
+        return i
+
+    def __contains__(self, asn):
+        i = bisect_left(self.asns, asn)
+        return i < len(self.asns) and self.asns[i] == asn
+
+    def __len__(self):
+        return len(self.asns)
+
+    def neighbors_of(self, asn):
+        # [(neighbor ASN, role)] sorted by neighbor ASN
+        i = self.position(asn)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return list(zip(self.neighbors[start:end], self.roles[start:end]))
+
+    def role_lists(self, asn):
+        # (upstreams, backups, peers, customers), each sorted by ASN
+        lists = ([], [], [], [])
+        for (neighb, role) in self.neighbors_of(asn):
+            lists[role].append(neighb)
+        return lists
+
+    def is_sdn(self, asn):
+        return bool(self.sdn[self.position(asn)])
+
+    def is_exa(self, asn):
+        return bool(self.exa[self.position(asn)])
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from gns3_client import GNS3Client
+from create_engine import plan_build, create_all, DEFAULT_WORKERS
+from checkpoint import Checkpoint, write_atomic, DEFAULT_EVERY, DEFAULT_INTERVAL
+from readiness import set_status
+from generate_configs import generate_configs, write_configs
+from transfer import build_bundle
+from gns3_topo_gen import config_files
+from fake_gns3_server import start_server
+from gen_topology import tiered_links, as_flags, write_topology
+
+
+DEFAULT_SIZES = '10,100,1000'
+DEFAULT_SEED = 1
+DEFAULT_SDN_RATIO = 0.05
+DEFAULT_EXA_RATIO = 0.1
+
+
+def synthetic_topology(num_ases, seed=DEFAULT_SEED, sdn_ratio=DEFAULT_SDN_RATIO, exa_ratio=DEFAULT_EXA_RATIO):
+    # a tiered topology from gen_topology; plan_build sizes the adapters of its nodes
+    out = io.StringIO()
+    write_topology(out, 'bench{}'.format(num_ases), as_flags(range(1, num_ases + 1), seed, sdn_ratio, exa_ratio),
+                   tiered_links(num_ases, seed=seed))
+    return json.loads(out.getvalue())
+
+
+def count_files(path):
+    return sum(len(files) for (_, _, files) in os.walk(path))
+
+
+def measure_build(json_topo, client, work_dir, workers):
+    # returns (phase -> seconds, node plan, link plan, checkpoint writes, bundle size)
+    topo_file = os.path.join(work_dir, 'topo.json')
+    phases = {}
+
+    mark = time.time()
+    checkpoint = Checkpoint(topo_file, json_topo, every=DEFAULT_EVERY, interval=DEFAULT_INTERVAL)
+    with checkpoint:
+        client.create_project(json_topo)
+        node_plan, link_plan = plan_build(json_topo)
+        create_all(json_topo, node_plan, link_plan, client.create_docker_node,
+                   client.create_docker_link, workers=workers, on_created=checkpoint.created)
+    phases['create'] = time.time() - mark
+
+    mark = time.time()
+    nodes = sorted(json_topo['gns3-nodes'])
+    set_status(client, json_topo, nodes, 'started', poll=0.05)
+    set_status(client, json_topo, nodes, 'stopped', poll=0.05)
+    phases['reboot'] = time.time() - mark
+
+    mark = time.time()
+    configs = generate_configs(json_topo)
+    write_configs(configs, os.path.join(work_dir, 'iface'), os.path.join(work_dir, 'router'),
+                  os.path.join(work_dir, 'onos'))
+    write_atomic(topo_file, json_topo)
+    bundle = build_bundle([f[1:] for f in config_files(json_topo, configs)])
+    phases['configs'] = time.time() - mark
+
+    return phases, node_plan, link_plan, checkpoint.writes + 1, len(bundle)
+
+
+def run_build(num_ases, workers, latency, jitter, failure_rate, seed, verbose=False):
+    # one build against a fresh fake server: project, nodes and links, a setup reboot,
+    # config generation and the deploy bundle (consoles and SSH are left out)
+    server = start_server(latency=latency, jitter=jitter, failure_rate=failure_rate, seed=seed)
+    client = GNS3Client('127.0.0.1', port=server.server_port, pool_size=max(workers, 1))
+    work_dir = tempfile.mkdtemp(prefix='gns3bench')
+    json_topo = synthetic_topology(num_ases, seed=seed)
+
+    try:
+        start = time.time()
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull if not verbose else sys.stdout):
+                phases, node_plan, link_plan, topo_writes, bundle = measure_build(json_topo, client,
+                                                                                  work_dir, workers)
+        wall = time.time() - start
+
+        return {
+            'ases': num_ases,
+            'nodes': len(node_plan),
+            'links': len(link_plan),
+            'wall': wall,
+            'phases': phases,
+            'requests': sum(timing[0] for timing in client.timings.values()),
+            'failures': server.fake.failures,
+            # config files plus every rewrite of the topology file
+            'file_writes': count_files(os.path.join(work_dir, 'iface')) +
+                           count_files(os.path.join(work_dir, 'router')) +
+                           count_files(os.path.join(work_dir, 'onos')) + topo_writes,
+            'bundle': bundle
+        }
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir)
+
+
+def print_results(results):
+    print('{:>6} {:>7} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9} {:>8} {:>9} {:>7} {:>10}'.format(
+        'ASes', 'nodes', 'links', 'wall (s)', 'create', 'reboot', 'configs', 'requests', 'req/s',
+        'injected', 'writes', 'bundle (B)'))
+    for res in results:
+        print('{:>6} {:>7} {:>7} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9} {:>8.1f} {:>9} {:>7} {:>10}'.format(
+            res['ases'], res['nodes'], res['links'], res['wall'], res['phases']['create'],
+            res['phases']['reboot'], res['phases']['configs'], res['requests'],
+            res['requests'] / res['wall'], res['failures'], res['file_writes'], res['bundle']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark full topology builds against a fake GNS3 server')
+    parser.add_argument('-s', '--sizes', dest='sizes', type=str, help='comma separated AS counts', default=DEFAULT_SIZES)
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='max concurrent GNS3 create requests', default=DEFAULT_WORKERS)
+    parser.add_argument('-l', '--latency', dest='latency', type=float, help='seconds the fake server adds to every request', default=0.0)
+    parser.add_argument('-j', '--jitter', dest='jitter', type=float, help='max random seconds added on top of the latency', default=0.0)
+    parser.add_argument('-f', '--failure-rate', dest='failure_rate', type=float, help='share of requests answered with 503', default=0.0)
+    parser.add_argument('--seed', dest='seed', type=int, help='seed of the topologies and injected faults', default=DEFAULT_SEED)
+    parser.add_argument('-v', '--verbose', dest='verbose', action='store_true', help='show the build output')
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        print('Building {} ASes...'.format(size))
+        results.append(run_build(size, args.workers, args.latency, args.jitter, args.failure_rate, args.seed,
+                                 verbose=args.verbose))
+    print_results(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/python3
+
+import sys
+import json
+import time
+import argparse
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from as_index import ASIndex, UPSTREAM, BACKUP, PEER, CUSTOMER
+from ipam import IPAM
+
+
+# local preferences set by the RM-*-IN route maps of form_router_bgp_configs; routes from a
+# customer that has us as backup provider come tagged with <asn>:2075 and get 75 too
+PREF_ORIGIN = 255
+PREF_CUSTOMER = 100
+PREF_PEER = 90
+PREF_UPSTREAM = 80
+PREF_BACKUP = 75
+
+ROLE_PREFS = {
+    UPSTREAM: PREF_UPSTREAM,
+    BACKUP: PREF_BACKUP,
+    PEER: PREF_PEER,
+    CUSTOMER: PREF_CUSTOMER
+}
+
+NO_ROUTE = -1
+
+
+class PolicyGraph(object):
+    # per AS position (ASes sorted by ASN, as in the ASIndex): neighbor positions with
+    # the role of each neighbor and the local preference given to routes it sends
+
+    __slots__ = ('asns', 'neighbors', 'roles', 'prefs', 'providers', 'peers', 'customers')
+
+    def __init__(self, as_index):
+        self.asns = list(as_index.asns)
+        size = len(self.asns)
+        self.neighbors = [[] for _ in range(size)]
+        self.roles = [[] for _ in range(size)]
+        self.prefs = [[] for _ in range(size)]
+        # plain (non-backup) relations, for the staged propagation
+        self.providers = [[] for _ in range(size)]
+        self.peers = [[] for _ in range(size)]
+        self.customers = [[] for _ in range(size)]
+
+        backups = set()
+        for i in range(size):
+            for (neighb, role) in as_index.neighbors_of(self.asns[i]):
+                if role == BACKUP:
+                    backups.add((i, as_index.position(neighb)))
+
+        for i in range(size):
+            for (neighb, role) in as_index.neighbors_of(self.asns[i]):
+                j = as_index.position(neighb)
+                pref = ROLE_PREFS[role]
+                if role == CUSTOMER and (j, i) in backups:
+                    pref = PREF_BACKUP
+                self.neighbors[i].append(j)
+                self.roles[i].append(role)
+                self.prefs[i].append(pref)
+                if role == UPSTREAM:
+                    self.providers[i].append(j)
+                elif role == PEER:
+                    self.peers[i].append(j)
+                elif role == CUSTOMER and (j, i) not in backups:
+                    self.customers[i].append(j)
+
+    def __len__(self):
+        return len(self.asns)
+
+
+class Routes(object):
+    # best route of every AS towards one origin: local preference and AS path (positions
+    # from the AS to the origin, both included), as the next hop announced it. Rivals
+    # announce the same prefix, an AS path ends at whichever origin won.
+
+    __slots__ = ('origin', 'origins', 'pref', 'paths')
+
+    def __init__(self, origin, size, rivals=()):
+        self.origin = origin
+        self.origins = set([origin]) | set(rivals)
+        self.pref = array('B', [0]) * size
+        self.paths = [None] * size
+        for i in self.origins:
+            self.pref[i] = PREF_ORIGIN
+            self.paths[i] = (i,)
+
+    def set(self, i, pref, next_hop):
+        self.pref[i] = pref
+        self.paths[i] = (i,) + self.paths[next_hop]
+
+    def length(self, i):
+        return len(self.paths[i]) - 1
+
+
+def from_customer(graph, routes, i):
+    # own routes and routes learnt from customers (community 3100) are announced to everyone,
+    # the others only to customers (RM-PROVIDER-OUT)
+    if i in routes.origins:
+        return True
+    k = graph.neighbors[i].index(routes.paths[i][1])
+    return graph.roles[i][k] == CUSTOMER
+
+
+def best_offer(graph, routes, i):
+    # (pref, next hop) of the best announcement the neighbors of i send it, or None
+    best = None
+    neighbors = graph.neighbors[i]
+    for k in range(len(neighbors)):
+        j = neighbors[k]
+        path = routes.paths[j]
+        if path is None or i in path:
+            continue
+        # j sends its customers everything, its providers and peers only customer routes
+        if graph.roles[i][k] not in (UPSTREAM, BACKUP) and not from_customer(graph, routes, j):
+            continue
+        offer = (graph.prefs[i][k], -len(path), -j)
+        if best is None or offer > best:
+            best = offer
+    return None if best is None else (best[0], -best[2])
+
+
+def propagate(graph, origin, rivals=()):
+    # Best routes of every AS towards one origin, with the policy of the generated configs:
+    # prefer by local preference, then by shortest AS path, then by lowest neighbor ASN.
+    # Without backup links this is the usual Gao-Rexford propagation, done as BFS stages:
+    # customer routes climb the providers, peers take them one hop, everything flows down
+    # to customers. Backup links only carry routes (local-pref 75) to ASes left without
+    # any, so they are settled afterwards by relaxing from those ASes until stable. Where
+    # backup links allow more than one stable outcome (BGP wedgies), this gives the intended
+    # one, with backups only carrying what the primary links cannot.
+    size = len(graph)
+    routes = Routes(origin, size, rivals)
+
+    # customer routes, level by level up the primary providers
+    holders = sorted(routes.origins)
+    frontier = list(holders)
+    while frontier:
+        reached = []
+        for i in sorted(frontier):
+            for j in graph.providers[i]:
+                if routes.pref[j] == 0:
+                    routes.set(j, PREF_CUSTOMER, i)
+                    reached.append(j)
+        holders += reached
+        frontier = reached
+
+    # peer routes, one hop from the holders of customer routes; shortest, then lowest ASN first
+    for i in sorted(holders, key=lambda i: (routes.length(i), i)):
+        for j in graph.peers[i]:
+            if routes.pref[j] == 0:
+                routes.set(j, PREF_PEER, i)
+
+    # provider routes, from every AS with a route down its primary customers
+    buckets = {}
+    for i in range(size):
+        if routes.pref[i]:
+            buckets.setdefault(routes.length(i), []).append(i)
+    length = 0
+    while buckets:
+        senders = sorted(buckets.pop(length, []))
+        length += 1
+        for i in senders:
+            for j in graph.customers[i]:
+                if routes.pref[j] == 0:
+                    routes.set(j, PREF_UPSTREAM, i)
+                    buckets.setdefault(length, []).append(j)
+
+    # backup links: relax the ASes still without a route next to one that has, and
+    # whatever their new routes change, until no route changes
+    queue = deque(i for i in range(size)
+                  if routes.pref[i] == 0 and any(routes.pref[j] for j in graph.neighbors[i]))
+    queued = set(queue)
+    while queue:
+        i = queue.popleft()
+        queued.discard(i)
+        best = best_offer(graph, routes, i)
+        if best is None:
+            if routes.pref[i] == 0:
+                continue
+            routes.pref[i] = 0
+            routes.paths[i] = None
+        elif best[0] == routes.pref[i] and routes.paths[i] == (i,) + routes.paths[best[1]]:
+            continue
+        else:
+            routes.set(i, best[0], best[1])
+        for j in graph.neighbors[i]:
+            if j not in queued and j not in routes.origins:
+                queued.add(j)
+                queue.append(j)
+
+    return routes
+
+
+def route_path(graph, routes, i):
+    # AS path from i to the origin as announced to i, i itself left out
+    return [graph.asns[j] for j in routes.paths[i][1:]]
+
+
+def routes_to_json(graph, routes):
+    # AS -> {"pref", "path"} for every AS with a route
+    table = {}
+    for i in range(len(graph)):
+        if routes.pref[i] and i != routes.origin:
+            table['AS{}'.format(graph.asns[i])] = {
+                'pref': routes.pref[i],
+                'path': route_path(graph, routes, i)
+            }
+    return table
+
+
+def summarize(graph, routes, router=None, table=False):
+    # (origin ASN, reachable ASes, summed AS path lengths, pref -> routes, (pref, path) of
+    # the router or None, AS -> route JSON or None), small enough to leave a worker process
+    reachable = 0
+    total_length = 0
+    prefs = {}
+    for i in range(len(graph)):
+        if i != routes.origin and routes.pref[i]:
+            reachable += 1
+            total_length += routes.length(i)
+            prefs[routes.pref[i]] = prefs.get(routes.pref[i], 0) + 1
+    rib_entry = None
+    if router is not None:
+        rib_entry = (routes.pref[router], route_path(graph, routes, router) if routes.pref[router] else None)
+    return (graph.asns[routes.origin], reachable, total_length, prefs, rib_entry,
+            routes_to_json(graph, routes) if table else None)
+
+
+# per worker process, set by the pool initializer
+WORKER_ARGS = None
+
+
+def init_worker(graph, router, table):
+    global WORKER_ARGS
+    WORKER_ARGS = (graph, router, table)
+
+
+def simulate_job(origin):
+    (graph, router, table) = WORKER_ARGS
+    return summarize(graph, propagate(graph, origin), router, table)
+
+
+def simulate(graph, origins, workers=1, router=None, table=False):
+    # yields the summary of every origin position, in order
+    if workers > 1 and len(origins) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(graph, router, table)) as executor:
+            for summary in executor.map(simulate_job, origins, chunksize=max(1, len(origins) // (workers * 8))):
+                yield summary
+    else:
+        for origin in origins:
+            yield summarize(graph, propagate(graph, origin), router, table)
+
+
+def print_rib(rib, prefixes):
+    # rib: [(origin ASN, local preference, AS path)], as seen from one AS
+    print('\t {:<18} {:>10} {:>7}  {}'.format('Network', 'Next AS', 'LocPrf', 'Path'))
+    for (origin, pref, path) in rib:
+        if pref == 0:
+            print('\t {:<18} {:>10} {:>7}  {}'.format(prefixes[origin], '-', '-', 'unreachable'))
+            continue
+        print('\t {:<18} {:>10} {:>7}  {}'.format(prefixes[origin], path[0] if path else '-',
+                                                 'local' if pref == PREF_ORIGIN else pref,
+                                                 ' '.join(str(asn) for asn in path) or 'i'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='simulate the BGP routes the generated policies lead to')
+    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input AS-level topology description', required=True)
+    parser.add_argument('-r', '--router', dest='router', type=int, help='print the predicted routing table of this AS')
+    parser.add_argument('--origin', dest='origin', type=int, help='only simulate the routes towards this AS')
+    parser.add_argument('-o', '--output', dest='output', type=str, help='write the routes of every origin to this file (JSON lines)')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of simulation processes', default=1)
+    args = parser.parse_args()
+
+    with open(args.input_topo_file, 'r') as f:
+        json_topo = json.load(f)
+
+    as_index = ASIndex(json_topo)
+    graph = PolicyGraph(as_index)
+    try:
+        origins = [as_index.position(args.origin)] if args.origin is not None else list(range(len(graph)))
+        router = as_index.position(args.router) if args.router is not None else None
+    except KeyError as e:
+        print('Unknown AS {}'.format(e))
+        sys.exit(1)
+
+    start = time.time()
+    out = open(args.output, 'w') if args.output else None
+    rib = []
+    reachable = 0
+    total_length = 0
+    prefs = {}
+    try:
+        for (origin, count, length, origin_prefs, rib_entry, table) in simulate(
+                graph, origins, workers=args.workers, router=router, table=out is not None):
+            reachable += count
+            total_length += length
+            for pref in origin_prefs:
+                prefs[pref] = prefs.get(pref, 0) + origin_prefs[pref]
+            if rib_entry is not None:
+                rib.append((origin,) + rib_entry)
+            if out is not None:
+                out.write(json.dumps({'origin': 'AS{}'.format(origin), 'routes': table}) + '\n')
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.time() - start
+
+    pairs = len(origins) * (len(graph) - 1)
+    print('Simulated {} origins over {} ASes in {:.2f}s'.format(len(origins), len(graph), elapsed))
+    print('\t {} of {} AS pairs reachable, mean AS path length {:.2f}'.format(
+        reachable, pairs, float(total_length) / reachable if reachable else 0.0))
+    print('\t best routes by local preference: {}'.format(
+        ', '.join('{}: {}'.format(pref, prefs[pref]) for pref in sorted(prefs, reverse=True))))
+
+    if router is not None:
+        ipam = IPAM(json_topo, as_index)
+        prefixes = dict((asn, ipam.host_prefix(asn)) for asn in graph.asns)
+        print('Routing table of R{}:'.format(args.router))
+        print_rib(rib, prefixes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+import os
+import json
+import time
+import tempfile
+
+
+DEFAULT_EVERY = 50
+DEFAULT_INTERVAL = 5.0
+JOURNAL_SUFFIX = '.journal'
+
+
+def write_atomic(path, json_topo):
+    # write next to the target and rename over it, so a crash never leaves a truncated file
+    dir_name = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.{}.'.format(os.path.basename(path)), dir=dir_name)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(json_topo, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_topo(path):
+    # load the last checkpoint and replay any journaled objects created after it
+    with open(path, 'r') as f:
+        json_topo = json.load(f)
+
+    journal_path = path + JOURNAL_SUFFIX
+    if os.path.isfile(journal_path):
+        with open(journal_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn last line of an interrupted run
+                    break
+                key = 'gns3-nodes' if entry['kind'] == 'node' else 'gns3-links'
+                json_topo.setdefault(key, {})[entry['name']] = entry['data']
+
+    return json_topo
+
+
+class Checkpoint(object):
+
+    def __init__(self, path, json_topo, every=DEFAULT_EVERY, interval=DEFAULT_INTERVAL, journal=False):
+        self.path = path
+        self.json_topo = json_topo
+        self.every = every
+        self.interval = interval
+        self.journal_path = path + JOURNAL_SUFFIX if journal else None
+        self.journal = None
+        self.pending = 0
+        self.last_save = time.time()
+        self.writes = 0
+
+    def __enter__(self):
+        if self.journal_path is not None:
+            self.journal = open(self.journal_path, 'a')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.save()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+            os.unlink(self.journal_path)
+        return False
+
+    def created(self, kind, name):
+        self.pending += 1
+        if self.journal is not None:
+            key = 'gns3-nodes' if kind == 'node' else 'gns3-links'
+            self.journal.write(json.dumps({
+                'kind': kind,
+                'name': name,
+                'data': self.json_topo[key][name]
+            }) + '\n')
+            self.journal.flush()
+
+        if self.pending >= self.every or time.time() - self.last_save >= self.interval:
+            self.save()
+
+    def save(self):
+        write_atomic(self.path, self.json_topo)
+        self.writes += 1
+        self.pending = 0
+        self.last_save = time.time()
+
+        # everything journaled so far is now compacted into the JSON
+        if self.journal is not None:
+            self.journal.seek(0)
+            self.journal.truncate()
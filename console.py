@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+
+import re
+import asyncio
+import tracing
+
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONCURRENCY = 64
+PROMPT_RE = re.compile(rb'[#$>] ?$')
+STATUS_RE = re.compile(rb'__rc=(\d+)__')
+
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+
+class ConsoleError(Exception):
+    pass
+
+
+class CommandResult(object):
+    __slots__ = ('command', 'output', 'status')
+
+    def __init__(self, command, output, status):
+        self.command = command
+        self.output = output
+        self.status = status
+
+    def __repr__(self):
+        return 'CommandResult({!r}, status={})'.format(self.command, self.status)
+
+
+class ConsoleSession(object):
+    # a single telnet console kept open for every batch run on the node
+
+    def __init__(self, host, port, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.buffer = b''
+        self.pending = b''
+        self.lock = asyncio.Lock()
+
+    async def open(self):
+        self.buffer = b''
+        self.pending = b''
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConsoleError('cannot connect to console {}:{}: {!r}'.format(self.host, self.port, e))
+        self.writer.write(b'\n')
+        await self.read_until(PROMPT_RE)
+        self.buffer = b''
+
+    def negotiate(self, data):
+        # strip telnet option negotiation and refuse every option
+        data = self.pending + data
+        self.pending = b''
+        out = bytearray()
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte != IAC:
+                out.append(byte)
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                self.pending = data[i:]
+                break
+            cmd = data[i + 1]
+            if cmd == IAC:
+                out.append(IAC)
+                i += 2
+            elif cmd in (DO, DONT, WILL, WONT):
+                if i + 2 >= len(data):
+                    self.pending = data[i:]
+                    break
+                if cmd == DO:
+                    self.writer.write(bytes([IAC, WONT, data[i + 2]]))
+                elif cmd == WILL:
+                    self.writer.write(bytes([IAC, DONT, data[i + 2]]))
+                i += 3
+            elif cmd == SB:
+                end = data.find(bytes([IAC, SE]), i + 2)
+                if end < 0:
+                    self.pending = data[i:]
+                    break
+                i = end + 2
+            else:
+                i += 2
+        return bytes(out)
+
+    async def read_until(self, pattern):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        while True:
+            match = pattern.search(self.buffer)
+            if match:
+                return match
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise ConsoleError('timeout waiting for {!r} on console {}:{}'.format(
+                    pattern.pattern, self.host, self.port))
+            try:
+                data = await asyncio.wait_for(self.reader.read(4096), remaining)
+            except asyncio.TimeoutError:
+                continue
+            if not data:
+                raise ConsoleError('console {}:{} closed'.format(self.host, self.port))
+            self.buffer += self.negotiate(data)
+
+    async def run(self, command):
+        self.buffer = b''
+        self.writer.write('{}; echo "__rc=$?__"\n'.format(command).encode('ascii'))
+        match = await self.read_until(STATUS_RE)
+        status = int(match.group(1))
+        output = self.buffer[:match.start()]
+        self.buffer = self.buffer[match.end():]
+        await self.read_until(PROMPT_RE)
+
+        # drop the echoed command line, if the console echoes input
+        lines = output.decode('ascii', 'replace').replace('\r', '').split('\n')
+        if lines and '__rc=$?__' in lines[0]:
+            lines = lines[1:]
+        return CommandResult(command, '\n'.join(lines).strip(), status)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class ConsoleManager(object):
+    # keeps one console connection per node and runs command batches on many nodes at once
+
+    def __init__(self, host, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY):
+        self.host = host
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.sessions = {}
+        self.loop = asyncio.new_event_loop()
+
+    def address(self, port):
+        # consoles of nodes on other computes are given as (host, port)
+        return port if isinstance(port, tuple) else (self.host, port)
+
+    async def run_batch(self, port, commands, semaphore):
+        address = self.address(port)
+        if address not in self.sessions:
+            self.sessions[address] = ConsoleSession(address[0], address[1], timeout=self.timeout)
+        session = self.sessions[address]
+
+        # batches for the same console run one after the other
+        lane = 'console {}:{}'.format(address[0], address[1])
+        async with semaphore, session.lock:
+            try:
+                if session.writer is None:
+                    with tracing.span('open', tracing.CONSOLE, lane=lane):
+                        await session.open()
+                with tracing.span('batch', tracing.CONSOLE, lane=lane, commands=len(commands)) as span:
+                    results = []
+                    for command in commands:
+                        results.append(await session.run(command))
+                    span.args['nonzero'] = sum(1 for result in results if result.status != 0)
+                return results
+            except ConsoleError:
+                # a broken console is reopened on the next batch
+                session.close()
+                raise
+
+    async def run_all(self, batches):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        names = list(batches)
+        results = await asyncio.gather(*[self.run_batch(batches[name][0], batches[name][1], semaphore)
+                                         for name in names], return_exceptions=True)
+        return dict(zip(names, results))
+
+    def run_batches(self, batches):
+        # batches: name -> (console port or (host, port), [commands]);
+        # returns name -> [CommandResult] or ConsoleError
+        return self.loop.run_until_complete(self.run_all(batches))
+
+    def run(self, port, commands):
+        result = self.run_batches({port: (port, commands)})[port]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def drop(self, ports):
+        for port in ports:
+            address = self.address(port)
+            if address in self.sessions:
+                self.sessions.pop(address).close()
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+        self.sessions = {}
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
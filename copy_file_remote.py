@@ -1,29 +1,31 @@
 #!/usr/bin/python3
 
 import os
+import sys
 import argparse
-# import paramiko
+from transfer import push_files, print_stats, TransferError
+import tracing
 
-USER = 'gns3'
-PASS = 'gns3'
 
 def main():
     parser = argparse.ArgumentParser(description='copy file to remote server')
     parser.add_argument('-f', '--file', dest='local_file', type=str, help='file to copy', required=True)
     parser.add_argument('-i', '--ip', dest='server_ip', type=str, help='ip of remote server', default='172.16.42.128')
     parser.add_argument('-p', '--path', dest='server_path', type=str, help='file path of remote server', required=True)
+    parser.add_argument('--trace', dest='trace', type=str, help='write the push span to this file (.jsonl for JSON lines, else Chrome trace)')
     args = parser.parse_args()
 
-    os.system('sshpass -p {} scp {} {}@{}:{}'.format(PASS, args.local_file, USER, args.server_ip, args.server_path))
-    # TODO: fix paramiko!!!
-    # ssh = paramiko.SSHClient()
-    # ssh.load_system_host_keys()
-    # ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    # ssh.connect(args.server_ip, username=USER, password=PASS)
-    # sftp = ssh.open_sftp()
-    # sftp.put(args.file, args.server_path)
-    # sftp.close()
-    # ssh.close()
+    with open(args.local_file, 'rb') as f:
+        content = f.read()
+    mode = os.stat(args.local_file).st_mode & 0o777
+    try:
+        print_stats(push_files(args.server_ip, [(content, args.server_path, mode)]))
+    except TransferError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        if args.trace:
+            tracing.write_trace(args.trace)
 
 if __name__ == '__main__':
     main()
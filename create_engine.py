@@ -0,0 +1,312 @@
+#!/usr/bin/python3
+
+import heapq
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from addressing import MONITOR_ADDRESS, ROUTER_MONITOR_ADDRESS
+
+
+DEFAULT_WORKERS = 8
+GLOBAL_SWITCH = 'Switch0'
+# ports per switch of the global fabric, the fan-out of its tree
+FABRIC_ADAPTERS = 16
+# most adapters the GNS3 server gives a docker node
+MAX_ADAPTERS = 99
+
+
+class AdapterError(Exception):
+
+    def __init__(self, needed):
+        Exception.__init__(self, 'more than {} adapters needed by {}'.format(
+            MAX_ADAPTERS, ', '.join('{} ({})'.format(node, needed[node]) for node in sorted(needed))))
+        self.needed = needed
+
+
+def fabric_members(json_topo):
+    # ONOS controllers and ExaBGP monitors hanging off the global switch fabric, in build order
+    members = []
+    for node in sorted(json_topo['as-nodes'].keys()):
+        node_num = node.split('AS')[1]
+        if json_topo['as-nodes'][node]['EXA']:
+            members.append('EXA{}'.format(node_num))
+        if json_topo['as-nodes'][node]['SDN']:
+            members.append('ONOS{}'.format(node_num))
+    return members
+
+
+def least_loaded(children, parents, load):
+    # hand every child to the parent with the fewest children so far
+    heap = [(load, i) for (i, parent) in enumerate(parents)]
+    heapq.heapify(heap)
+    attached = OrderedDict()
+    for child in children:
+        (count, i) = heapq.heappop(heap)
+        attached[child] = parents[i]
+        heapq.heappush(heap, (count + 1, i))
+    return attached
+
+
+def plan_fabric(members, adapters=FABRIC_ADAPTERS):
+    # Global switch layer as a tree of OVS switches rooted at Switch0. Leaves keep one
+    # adapter for their uplink; levels are added until the top one fits Switch0.
+    # Returns the switches (root first), member -> switch and [(switch, parent)] uplinks.
+    if len(members) <= adapters:
+        return [GLOBAL_SWITCH], least_loaded(members, [GLOBAL_SWITCH], 0), []
+
+    sizes = [-(-len(members) // (adapters - 1))]
+    while sizes[-1] > adapters:
+        sizes.append(-(-sizes[-1] // (adapters - 1)))
+
+    switches = [GLOBAL_SWITCH]
+    uplinks = []
+    parents = [GLOBAL_SWITCH]
+    for size in reversed(sizes):
+        level = ['Switch{}'.format(len(switches) + i) for i in range(size)]
+        switches.extend(level)
+        uplinks.extend(least_loaded(level, parents, 0).items())
+        parents = level
+
+    return switches, least_loaded(members, parents, 0), uplinks
+
+
+def plan_nodes(json_topo):
+    # ordered node name -> docker node properties, same order as a sequential build;
+    # the adapters are sized from the links by plan_build
+    nodes = OrderedDict()
+    for node in sorted(json_topo['as-nodes'].keys()):
+        node_num = node.split('AS')[1]
+
+        nodes['H{}'.format(node_num)] = {
+            'image': 'gns3/endhost'
+        }
+        nodes['R{}'.format(node_num)] = {
+            'image': 'ajnouri/quagga_alpine'
+        }
+        if json_topo['as-nodes'][node]['SDN']:
+            nodes['OVS{}'.format(node_num)] = {
+                'image': 'gns3/openvswitch'
+            }
+            nodes['ONOS{}'.format(node_num)] = {
+                'image': 'onosproject/onos:1.12.0',
+                'start_command': 'cli'
+            }
+        if json_topo['as-nodes'][node]['EXA']:
+            nodes['EXA{}'.format(node_num)] = {
+                'image': 'mavromat/exabgp-monitor',
+                'environment': 'LOCAL_IP={}\nLOCAL_AS={}\nREMOTE_IP={}'.format(MONITOR_ADDRESS, node_num,
+                                                                            ROUTER_MONITOR_ADDRESS)
+            }
+
+    (switches, attached, uplinks) = plan_fabric(fabric_members(json_topo))
+    for switch in switches:
+        nodes[switch] = {
+            'image': 'gns3/openvswitch'
+        }
+
+    return nodes
+
+
+def plan_links(json_topo, node_names):
+    # ordered list of (node1, adapter1, node2, adapter2), same adapters as a sequential build
+    links = []
+
+    next_av_adapter = {}
+    for node in node_names:
+        next_av_adapter[node] = 0
+
+    def connect_link_between(node1, node2):
+        links.append((node1, next_av_adapter[node1], node2, next_av_adapter[node2]))
+        next_av_adapter[node1] += 1
+        next_av_adapter[node2] += 1
+
+    (switches, attached, uplinks) = plan_fabric(fabric_members(json_topo))
+
+    # Connecting Devices with OVS switches (internal)
+    for node in sorted(json_topo['as-nodes'].keys()):
+        node_num = node.split('AS')[1]
+
+        if json_topo['as-nodes'][node]['SDN']:
+            as_conn_name = 'OVS{}'.format(node_num)
+            next_av_adapter[as_conn_name] = 1
+
+            onos_name = 'ONOS{}'.format(node_num)
+            router_name = 'R{}'.format(node_num)
+            host_name = 'H{}'.format(node_num)
+            for device in [onos_name, router_name, host_name]:
+                connect_link_between(as_conn_name, device)
+
+            # Connect ONOS with BGP Speaker
+            connect_link_between(onos_name, router_name)
+
+            if json_topo['as-nodes'][node]['EXA']:
+                # Connect Monitor with BGP Speaker
+                exa_name = 'EXA{}'.format(node_num)
+                connect_link_between(router_name, exa_name)
+
+                # Monitors and controllers share the global switch fabric
+                connect_link_between(exa_name, attached[exa_name])
+
+            connect_link_between(onos_name, attached[onos_name])
+        else:
+            as_host_name = 'H{}'.format(node_num)
+            as_conn_name = 'R{}'.format(node_num)
+
+            connect_link_between(as_host_name, as_conn_name)
+
+            if json_topo['as-nodes'][node]['EXA']:
+                # Connect Monitor with BGP Speaker
+                exa_name = 'EXA{}'.format(node_num)
+                connect_link_between(as_conn_name, exa_name)
+
+                # Monitors and controllers share the global switch fabric
+                connect_link_between(exa_name, attached[exa_name])
+
+    # Connecting the global switch fabric, leaves towards Switch0
+    for (switch, parent) in uplinks:
+        connect_link_between(switch, parent)
+
+    # Connecting AS routers with other AS routers (external)
+    for link in sorted(json_topo['as-links']):
+        (src_as, dst_as) = link.split('-')
+        src_as_num = src_as.split('AS')[1]
+        dst_as_num = dst_as.split('AS')[1]
+
+        if json_topo['as-nodes'][src_as]['SDN']:
+            src_router_name = 'OVS{}'.format(src_as_num)
+        else:
+            src_router_name = 'R{}'.format(src_as_num)
+
+        if json_topo['as-nodes'][dst_as]['SDN']:
+            dst_router_name = 'OVS{}'.format(dst_as_num)
+        else:
+            dst_router_name = 'R{}'.format(dst_as_num)
+
+        connect_link_between(src_router_name, dst_router_name)
+
+    needed = dict((node, next_av_adapter[node]) for node in next_av_adapter
+                  if next_av_adapter[node] > MAX_ADAPTERS)
+    if needed:
+        raise AdapterError(needed)
+
+    return links
+
+
+def plan_build(json_topo):
+    # node and link plans, every node created with exactly the adapters its links use
+    node_plan = plan_nodes(json_topo)
+    link_plan = plan_links(json_topo, node_plan)
+
+    used = {}
+    for (node1, adapter1, node2, adapter2) in link_plan:
+        used[node1] = max(used.get(node1, 0), adapter1 + 1)
+        used[node2] = max(used.get(node2, 0), adapter2 + 1)
+    for node in node_plan:
+        node_plan[node]['adapters'] = max(used.get(node, 0), 1)
+
+    return node_plan, link_plan
+
+
+def link_name(link):
+    return '{}:{}-{}:{}'.format(*link)
+
+
+def create_all(json_topo, node_plan, link_plan, create_node, create_link,
+               workers=DEFAULT_WORKERS, on_created=None):
+    # Every node is independent; a link depends only on its two endpoint nodes
+    # and never shares an adapter with another link, so it is submitted as soon
+    # as both of its endpoints exist. Results are stored from this thread only.
+    # On the first failure nothing new is submitted and the queued creates are
+    # cancelled; whatever the calls in flight still create is recorded before
+    # the failure is raised, so a resumed build does not create it twice.
+    if 'gns3-nodes' not in json_topo:
+        json_topo['gns3-nodes'] = {}
+    if 'gns3-links' not in json_topo:
+        json_topo['gns3-links'] = {}
+
+    created = []
+    waiting_links = {}
+    links_of_node = {}
+    for link in link_plan:
+        name = link_name(link)
+        if name in json_topo['gns3-links']:
+            continue
+        missing = set([link[0], link[2]]) - set(json_topo['gns3-nodes'])
+        waiting_links[name] = (link, len(missing))
+        for node in missing:
+            links_of_node.setdefault(node, []).append(name)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {}
+
+        def submit_link(name, link):
+            print('\t Connecting {}:{} with {}:{}...'.format(*link))
+            future = executor.submit(create_link, json_topo, src_hname=link[0], src_anum=link[1],
+                                     dst_hname=link[2], dst_anum=link[3])
+            futures[future] = ('link', name)
+
+        for name in node_plan:
+            if name in json_topo['gns3-nodes']:
+                continue
+            print('\t Creating {}...'.format(name))
+            future = executor.submit(create_node, json_topo, name=name, **node_plan[name])
+            futures[future] = ('node', name)
+
+        for name in list(waiting_links):
+            (link, missing) = waiting_links[name]
+            if missing == 0:
+                del waiting_links[name]
+                submit_link(name, link)
+
+        failure = None
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                (kind, name) = futures.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print('\t Creating {} failed: {}'.format(name, e))
+                    if failure is None:
+                        failure = e
+                        for pending in futures:
+                            pending.cancel()
+                    continue
+                if kind == 'node':
+                    json_topo['gns3-nodes'][name] = result
+                    print('\t {} created!'.format(name))
+                    for dep in links_of_node.get(name, []) if failure is None else []:
+                        (link, missing) = waiting_links[dep]
+                        if missing == 1:
+                            del waiting_links[dep]
+                            submit_link(dep, link)
+                        else:
+                            waiting_links[dep] = (link, missing - 1)
+                else:
+                    json_topo['gns3-links'][name] = result
+                    print('\t {} connected!'.format(name))
+                created.append((kind, name))
+                if on_created is not None:
+                    on_created(kind, name)
+
+    if failure is not None:
+        raise failure
+
+    # keep the same key order a sequential run would produce
+    order_like(json_topo, 'gns3-nodes', list(node_plan))
+    order_like(json_topo, 'gns3-links', [link_name(link) for link in link_plan])
+
+    return created
+
+
+def order_like(json_topo, key, names):
+    current = json_topo[key]
+    ordered = OrderedDict()
+    for name in names:
+        if name in current:
+            ordered[name] = current[name]
+    for name in current:
+        if name not in ordered:
+            ordered[name] = current[name]
+    json_topo[key] = dict(ordered)
@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+
+import os
+import json
+import hashlib
+from checkpoint import write_atomic
+
+
+DEFAULT_MANIFEST = './deploy_manifest.json'
+
+
+def content_hash(content):
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def plan_deploy(manifest, project_id, files, force=False):
+    # files: [(node, content, remote path, mode)]; keep only files whose content changed since
+    # the last deploy into this project and collect the nodes they belong to
+    deployed = manifest.get(project_id, {})
+    to_push = []
+    changed_nodes = set()
+    hashes = {}
+    for (node, content, remote_path, mode) in files:
+        digest = content_hash(content)
+        hashes.setdefault(node, {})[remote_path] = digest
+        if force or deployed.get(node, {}).get(remote_path) != digest:
+            to_push.append((content, remote_path, mode))
+            changed_nodes.add(node)
+    return to_push, changed_nodes, hashes
+
+
+def record_deploy(path, manifest, project_id, hashes):
+    deployed = manifest.setdefault(project_id, {})
+    for node in hashes:
+        deployed.setdefault(node, {}).update(hashes[node])
+    write_atomic(path, manifest)
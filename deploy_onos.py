@@ -0,0 +1,214 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import time
+import argparse
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ipam import IPAM, natural_key
+from generate_configs import DEFAULT_ONOS_CONFIGS_DIR
+import tracing
+
+
+ONOS_PORT = 8181
+ONOS_USER = 'onos'
+ONOS_PASSWORD = 'rocks'
+DEFAULT_APPS = ('org.onosproject.openflow', 'org.onosproject.proxyarp',
+                'org.onosproject.reactive-routing', 'org.onosproject.artemis')
+DEFAULT_WORKERS = 16
+DEFAULT_READY_TIMEOUT = 300.0
+DEFAULT_POLL = 2.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 30
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class OnosDeployError(Exception):
+    pass
+
+
+class OnosClient(object):
+    # one keep-alive session for the REST APIs of every ONOS instance
+
+    def __init__(self, pool_size=DEFAULT_WORKERS, user=ONOS_USER, password=ONOS_PASSWORD,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=None, raise_on_status=False)
+        self.session = requests.Session()
+        self.session.auth = (user, password)
+        self.session.mount('http://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                  max_retries=retry))
+        # a booting instance refuses connections, readiness polls should not back off on it
+        self.probe = requests.Session()
+        self.probe.auth = (user, password)
+        self.probe.mount('http://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                max_retries=0))
+
+    def request(self, name, endpoint, method, address, path, payload=None):
+        with tracing.span(endpoint, tracing.REST, lane=name) as span:
+            res = self.session.request(method, 'http://{}/onos/v1{}'.format(address, path),
+                                       data=None if payload is None else json.dumps(payload),
+                                       headers={'Content-Type': 'application/json'}, timeout=self.timeout)
+            span.failed = res.status_code >= 400
+        if res.status_code >= 400:
+            raise OnosDeployError('{} {} on {} failed with {}: {}'.format(method, path, name, res.status_code,
+                                                                          res.text[:200]))
+        return res
+
+    def wait_ready(self, name, address, timeout=DEFAULT_READY_TIMEOUT, poll=DEFAULT_POLL):
+        # poll the application list until the REST API answers
+        start = time.time()
+        with tracing.span('ready', tracing.REST, lane=name) as span:
+            polls = 0
+            while True:
+                polls += 1
+                try:
+                    res = self.probe.get('http://{}/onos/v1/applications'.format(address), timeout=poll)
+                    if res.status_code == 200:
+                        break
+                    if res.status_code == 401:
+                        raise OnosDeployError('{} refused the REST credentials'.format(name))
+                except requests.RequestException:
+                    pass
+                if time.time() - start > timeout:
+                    raise OnosDeployError('{} REST API not ready after {:.0f}s'.format(name, timeout))
+                time.sleep(poll)
+            span.args['polls'] = polls
+        return time.time() - start
+
+    def push_netcfg(self, name, address, netcfg):
+        self.request(name, 'POST /network/configuration', 'POST', address, '/network/configuration', netcfg)
+
+    def activate(self, name, address, app):
+        self.request(name, 'POST /applications/{app}/active', 'POST', address,
+                     '/applications/{}/active'.format(app))
+
+    def close(self):
+        self.session.close()
+        self.probe.close()
+
+
+def onos_endpoints(json_topo, asns, port=ONOS_PORT, overrides=None):
+    # ONOS name -> host:port of its REST API, by default its address on the global fabric
+    overrides = overrides or {}
+    ipam = IPAM(json_topo)
+    endpoints = {}
+    for asn in asns:
+        name = 'ONOS{}'.format(asn)
+        endpoints[name] = overrides.get(name) or '{}:{}'.format(ipam.fabric_address(name), port)
+    return endpoints
+
+
+def deploy_instance(client, name, address, netcfg, apps, ready_timeout, poll):
+    # wait for the REST API, upload the network config, then activate the apps; returns
+    # name -> seconds per step, or the error that stopped it
+    timing = {'name': name, 'address': address, 'error': None}
+    start = time.time()
+    try:
+        timing['ready'] = client.wait_ready(name, address, timeout=ready_timeout, poll=poll)
+        mark = time.time()
+        client.push_netcfg(name, address, netcfg)
+        timing['netcfg'] = time.time() - mark
+        mark = time.time()
+        for app in apps:
+            client.activate(name, address, app)
+        timing['apps'] = time.time() - mark
+    except (OnosDeployError, requests.RequestException) as e:
+        timing['error'] = str(e)
+    timing['total'] = time.time() - start
+    return timing
+
+
+def deploy_all(client, targets, apps=DEFAULT_APPS, workers=DEFAULT_WORKERS,
+               ready_timeout=DEFAULT_READY_TIMEOUT, poll=DEFAULT_POLL):
+    # targets: ONOS name -> (host:port, netcfg); every instance at once
+    names = sorted(targets, key=natural_key)
+    with tracing.span('onos', instances=len(names)):
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names) or 1))) as executor:
+            futures = [executor.submit(deploy_instance, client, name, targets[name][0], targets[name][1],
+                                       apps, ready_timeout, poll) for name in names]
+            return [future.result() for future in futures]
+
+
+def print_results(results):
+    print('\t {:<10} {:<22} {:>9} {:>9} {:>9} {:>9}  {}'.format('ONOS', 'REST API', 'ready (s)', 'netcfg',
+                                                               'apps', 'total', 'error'))
+    for res in results:
+        steps = ['{:.2f}'.format(res[step]) if step in res else '-' for step in ('ready', 'netcfg', 'apps')]
+        print('\t {:<10} {:<22} {:>9} {:>9} {:>9} {:>9.2f}  {}'.format(res['name'], res['address'], steps[0],
+                                                                      steps[1], steps[2], res['total'],
+                                                                      res['error'] or ''))
+
+
+def load_netcfgs(onos_dir, asns):
+    # ONOS name -> netcfg written by form_onos
+    netcfgs = {}
+    missing = []
+    for asn in asns:
+        path = os.path.join(onos_dir, 'onos{}_netcfg.conf'.format(asn))
+        if not os.path.isfile(path):
+            missing.append(path)
+            continue
+        with open(path, 'r') as f:
+            netcfgs['ONOS{}'.format(asn)] = json.load(f)
+    if missing:
+        raise OnosDeployError('missing ONOS configs: {}'.format(', '.join(missing)))
+    return netcfgs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='deploy the ONOS network configs of every SDN AS')
+    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with the GNS3 topology description', required=True)
+    parser.add_argument('-d', '--dir', dest='onos_dir', type=str, help='directory with the ONOS configs', default=DEFAULT_ONOS_CONFIGS_DIR)
+    parser.add_argument('-e', '--endpoints', dest='endpoints', type=str, help='JSON file mapping ONOS names to host:port of their REST API')
+    parser.add_argument('-p', '--port', dest='port', type=int, help='ONOS REST port on the fabric addresses', default=ONOS_PORT)
+    parser.add_argument('-u', '--user', dest='user', type=str, help='ONOS REST user', default=ONOS_USER)
+    parser.add_argument('--password', dest='password', type=str, help='ONOS REST password', default=ONOS_PASSWORD)
+    parser.add_argument('-a', '--apps', dest='apps', type=str, help='comma separated apps to activate', default=','.join(DEFAULT_APPS))
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='max ONOS instances deployed at once', default=DEFAULT_WORKERS)
+    parser.add_argument('--ready-timeout', dest='ready_timeout', type=float, help='max seconds for each REST API to come up', default=DEFAULT_READY_TIMEOUT)
+    parser.add_argument('--poll', dest='poll', type=float, help='seconds between readiness polls', default=DEFAULT_POLL)
+    parser.add_argument('--trace', dest='trace', type=str, help='write the REST spans to this file (.jsonl for JSON lines, else Chrome trace)')
+    args = parser.parse_args()
+
+    with open(args.input_topo_file, 'r') as f:
+        json_topo = json.load(f)
+    asns = sorted(int(node[2:]) for node in json_topo['as-nodes'] if json_topo['as-nodes'][node]['SDN'])
+
+    overrides = {}
+    if args.endpoints:
+        with open(args.endpoints, 'r') as f:
+            overrides = json.load(f)
+
+    try:
+        netcfgs = load_netcfgs(args.onos_dir, asns)
+    except OnosDeployError as e:
+        print(e)
+        sys.exit(1)
+    endpoints = onos_endpoints(json_topo, asns, port=args.port, overrides=overrides)
+    targets = dict((name, (endpoints[name], netcfgs[name])) for name in netcfgs)
+
+    print('Deploying {} ONOS network configs...'.format(len(targets)))
+    client = OnosClient(pool_size=max(args.workers, 1), user=args.user, password=args.password)
+    try:
+        results = deploy_all(client, targets, apps=[app for app in args.apps.split(',') if app],
+                             workers=args.workers, ready_timeout=args.ready_timeout, poll=args.poll)
+    finally:
+        client.close()
+        if args.trace:
+            tracing.write_trace(args.trace)
+    print_results(results)
+
+    if any(res['error'] for res in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/python3
+
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+FIRST_CONSOLE_PORT = 5000
+
+PROJECT_RE = re.compile(r'^/v2/projects/?$')
+NODES_RE = re.compile(r'^/v2/projects/([^/]+)/nodes/?$')
+NODE_RE = re.compile(r'^/v2/projects/([^/]+)/nodes/([^/]+)/?$')
+NODE_ACTION_RE = re.compile(r'^/v2/projects/([^/]+)/nodes/([^/]+)/(start|stop|reload)/?$')
+LINKS_RE = re.compile(r'^/v2/projects/([^/]+)/links/?$')
+LINK_RE = re.compile(r'^/v2/projects/([^/]+)/links/([^/]+)/?$')
+
+ACTION_STATUS = {
+    'start': 'started',
+    'stop': 'stopped',
+    'reload': 'started'
+}
+
+
+def port_key(end):
+    return (end['node_id'], end['adapter_number'], end.get('port_number', 0))
+
+
+class FakeGNS3(object):
+    # in-memory projects, nodes and links, shaped like the GNS3 v2 API answers
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None, console_host='127.0.0.1'):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.console_host = console_host
+        self.lock = threading.Lock()
+        self.projects = {}
+        self.next_console = FIRST_CONSOLE_PORT
+        self.requests = 0
+        self.failures = 0
+
+    def delay(self):
+        with self.lock:
+            self.requests += 1
+            pause = self.latency + self.random.uniform(0, self.jitter)
+            fail = self.random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if pause > 0:
+            time.sleep(pause)
+        return fail
+
+    def project(self, project_id):
+        if project_id not in self.projects:
+            raise KeyError('project {}'.format(project_id))
+        return self.projects[project_id]
+
+    def create_project(self, body):
+        project_id = str(uuid.uuid4())
+        with self.lock:
+            self.projects[project_id] = {
+                'project': {
+                    'project_id': project_id,
+                    'name': body['name'],
+                    'path': '/opt/gns3/projects/{}'.format(project_id),
+                    'filename': '{}.gns3'.format(body['name']),
+                    'status': 'opened'
+                },
+                'nodes': {},
+                'links': {},
+                'ports': set()
+            }
+            return 201, self.projects[project_id]['project']
+
+    def create_node(self, project_id, body):
+        with self.lock:
+            project = self.project(project_id)
+            node_id = str(uuid.uuid4())
+            node = {
+                'node_id': node_id,
+                'project_id': project_id,
+                'name': body['name'],
+                'node_type': body.get('node_type', 'docker'),
+                'compute_id': body.get('compute_id', 'local'),
+                'console': self.next_console,
+                'console_host': self.console_host,
+                'console_type': 'telnet',
+                'status': 'stopped',
+                'properties': dict(body.get('properties', {})),
+                'symbol': body.get('symbol'),
+                'label': {'text': body['name'], 'x': 0, 'y': -25},
+                'x': 0, 'y': 0, 'z': 1, 'width': 60, 'height': 60
+            }
+            image = node['properties'].get('image', '')
+            if image and ':' not in image:
+                node['properties']['image'] = '{}:latest'.format(image)
+            self.next_console += 1
+            project['nodes'][node_id] = node
+            return 201, node
+
+    def create_link(self, project_id, body):
+        with self.lock:
+            project = self.project(project_id)
+            ends = []
+            for end in body['nodes']:
+                if end['node_id'] not in project['nodes']:
+                    return 404, {'message': 'node {} does not exist'.format(end['node_id'])}
+                if end['adapter_number'] >= project['nodes'][end['node_id']]['properties'].get('adapters', 1):
+                    return 409, {'message': 'adapter {} does not exist'.format(end['adapter_number'])}
+                if port_key(end) in project['ports']:
+                    return 409, {'message': 'port already used'}
+                ends.append(dict(end, label={'text': 'e{}'.format(end['adapter_number'])}))
+            for end in ends:
+                project['ports'].add(port_key(end))
+            link_id = str(uuid.uuid4())
+            link = {
+                'link_id': link_id,
+                'project_id': project_id,
+                'link_type': 'ethernet',
+                'nodes': ends,
+                'capturing': False,
+                'capture_file_name': None,
+                'capture_file_path': None,
+                'suspend': False,
+                'filters': {}
+            }
+            project['links'][link_id] = link
+            return 201, link
+
+    def delete_link(self, project_id, link_id):
+        project = self.project(project_id)
+        for end in project['links'].pop(link_id)['nodes']:
+            project['ports'].discard(port_key(end))
+
+    def update_node(self, project_id, node_id, body):
+        node = self.project(project_id)['nodes'][node_id]
+        properties = body.get('properties', {})
+        # like docker nodes, the adapters only change while the node is stopped
+        if 'adapters' in properties and node['status'] != 'stopped':
+            return 409, {'message': 'node {} must be stopped to change its adapters'.format(node['name'])}
+        node['properties'].update(properties)
+        return 200, node
+
+    def node_action(self, project_id, node_id, action):
+        with self.lock:
+            node = self.project(project_id)['nodes'][node_id]
+            node['status'] = ACTION_STATUS[action]
+            return 200, node
+
+    def handle(self, method, path, body):
+        if method == 'POST' and PROJECT_RE.match(path):
+            return self.create_project(body)
+
+        r = NODE_ACTION_RE.match(path)
+        if r and method == 'POST':
+            return self.node_action(r.group(1), r.group(2), r.group(3))
+
+        r = NODES_RE.match(path)
+        if r:
+            if method == 'POST':
+                return self.create_node(r.group(1), body)
+            if method == 'GET':
+                with self.lock:
+                    return 200, list(self.project(r.group(1))['nodes'].values())
+
+        r = NODE_RE.match(path)
+        if r:
+            with self.lock:
+                nodes = self.project(r.group(1))['nodes']
+                if method == 'GET':
+                    return 200, nodes[r.group(2)]
+                if method == 'PUT':
+                    return self.update_node(r.group(1), r.group(2), body)
+                if method == 'DELETE':
+                    links = self.projects[r.group(1)]['links']
+                    for link_id in [link_id for link_id in links
+                                    if any(end['node_id'] == r.group(2) for end in links[link_id]['nodes'])]:
+                        self.delete_link(r.group(1), link_id)
+                    del nodes[r.group(2)]
+                    return 204, None
+
+        r = LINKS_RE.match(path)
+        if r:
+            if method == 'POST':
+                return self.create_link(r.group(1), body)
+            if method == 'GET':
+                with self.lock:
+                    return 200, list(self.project(r.group(1))['links'].values())
+
+        r = LINK_RE.match(path)
+        if r and method == 'DELETE':
+            with self.lock:
+                self.delete_link(r.group(1), r.group(2))
+                return 204, None
+
+        return 404, {'message': 'no route for {} {}'.format(method, path)}
+
+
+class Handler(BaseHTTPRequestHandler):
+    # keep-alive like the real server; headers and body go out as separate writes, so
+    # without TCP_NODELAY every answer would wait for a delayed ACK
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, payload):
+        data = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def dispatch(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        fake = self.server.fake
+
+        # injected failures happen before any state change, so retrying them is safe
+        if fake.delay():
+            self.reply(503, {'message': 'injected failure'})
+            return
+        try:
+            body = json.loads(raw.decode('utf-8')) if raw else {}
+            status, payload = fake.handle(method, self.path, body)
+        except KeyError as e:
+            status, payload = 404, {'message': 'unknown {}'.format(e)}
+        except ValueError as e:
+            status, payload = 400, {'message': str(e)}
+        self.reply(status, payload)
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host='127.0.0.1', port=0, **kwargs):
+    # serve in a background thread; port 0 picks a free one (see server.server_port)
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeGNS3(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='serve a fake GNS3 v2 REST API for local builds and benchmarks')
+    parser.add_argument('-H', '--host', dest='host', type=str, help='address to listen on', default='127.0.0.1')
+    parser.add_argument('-p', '--port', dest='port', type=int, help='port to listen on', default=3080)
+    parser.add_argument('-l', '--latency', dest='latency', type=float, help='seconds added to every request', default=0.0)
+    parser.add_argument('-j', '--jitter', dest='jitter', type=float, help='max random seconds added on top of the latency', default=0.0)
+    parser.add_argument('-f', '--failure-rate', dest='failure_rate', type=float, help='share of requests answered with 503', default=0.0)
+    parser.add_argument('-s', '--seed', dest='seed', type=int, help='seed of the jitter and failure draws', default=None)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeGNS3(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                           seed=args.seed, console_host=args.host)
+    print('Fake GNS3 server listening on {}:{}'.format(args.host, server.server_port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print('{} requests served, {} failures injected'.format(server.fake.requests, server.fake.failures))
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+
+import re
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+APPLICATIONS_RE = re.compile(r'^/onos/v1/applications/?$')
+APP_ACTIVE_RE = re.compile(r'^/onos/v1/applications/([^/]+)/active/?$')
+NETCFG_RE = re.compile(r'^/onos/v1/network/configuration/?$')
+
+
+def merge(target, source):
+    # netcfg uploads merge into what the instance already has, subject by subject
+    for key in source:
+        if isinstance(source[key], dict) and isinstance(target.get(key), dict):
+            merge(target[key], source[key])
+        else:
+            target[key] = source[key]
+
+
+class FakeONOS(object):
+    # the parts of one ONOS instance's REST API the deploy stage uses
+
+    def __init__(self, boot_delay=0.0, latency=0.0, failure_rate=0.0, seed=None, user='onos', password='rocks'):
+        self.ready_at = time.time() + boot_delay
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.auth = 'Basic {}'.format(base64.b64encode('{}:{}'.format(user, password).encode('utf-8')).decode('ascii'))
+        self.lock = threading.Lock()
+        self.netcfg = {}
+        self.active = set(['org.onosproject.drivers'])
+        self.requests = 0
+        self.failures = 0
+
+    def delay(self):
+        with self.lock:
+            self.requests += 1
+            fail = self.random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return fail
+
+    def handle(self, method, path, body):
+        # still booting: the web server is up but the REST API is not
+        if time.time() < self.ready_at:
+            return 503, {'message': 'ONOS is starting'}
+
+        if APPLICATIONS_RE.match(path) and method == 'GET':
+            with self.lock:
+                return 200, {'applications': [{'name': app, 'state': 'ACTIVE'} for app in sorted(self.active)]}
+
+        r = APP_ACTIVE_RE.match(path)
+        if r:
+            with self.lock:
+                if method == 'POST':
+                    self.active.add(r.group(1))
+                elif method == 'DELETE':
+                    self.active.discard(r.group(1))
+                return 200, {'name': r.group(1), 'state': 'ACTIVE' if r.group(1) in self.active else 'INSTALLED'}
+
+        if NETCFG_RE.match(path):
+            with self.lock:
+                if method == 'POST':
+                    merge(self.netcfg, body)
+                    return 200, None
+                if method == 'GET':
+                    return 200, self.netcfg
+
+        return 404, {'message': 'no route for {} {}'.format(method, path)}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, payload):
+        data = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def dispatch(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        fake = self.server.fake
+
+        if self.headers.get('Authorization') != fake.auth:
+            self.reply(401, {'message': 'unauthorized'})
+            return
+        if fake.delay():
+            self.reply(503, {'message': 'injected failure'})
+            return
+        try:
+            body = json.loads(raw.decode('utf-8')) if raw else {}
+            status, payload = fake.handle(method, self.path, body)
+        except ValueError as e:
+            status, payload = 400, {'message': str(e)}
+        self.reply(status, payload)
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host='127.0.0.1', port=0, **kwargs):
+    # serve one instance in a background thread; port 0 picks a free one (see server.server_port)
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeONOS(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='serve fake ONOS REST APIs for local deploys')
+    parser.add_argument('-H', '--host', dest='host', type=str, help='address to listen on', default='127.0.0.1')
+    parser.add_argument('-p', '--port', dest='port', type=int, help='port of the first instance', default=8181)
+    parser.add_argument('-n', '--instances', dest='instances', type=int, help='number of instances, on consecutive ports', default=1)
+    parser.add_argument('-b', '--boot-delay', dest='boot_delay', type=float, help='seconds before the REST API is ready', default=0.0)
+    parser.add_argument('-l', '--latency', dest='latency', type=float, help='seconds added to every request', default=0.0)
+    parser.add_argument('-f', '--failure-rate', dest='failure_rate', type=float, help='share of requests answered with 503', default=0.0)
+    parser.add_argument('-s', '--seed', dest='seed', type=int, help='seed of the failure draws', default=None)
+    args = parser.parse_args()
+
+    servers = []
+    for i in range(args.instances):
+        servers.append(start_server(args.host, args.port + i, boot_delay=args.boot_delay, latency=args.latency,
+                                    failure_rate=args.failure_rate, seed=args.seed))
+        print('Fake ONOS listening on {}:{}'.format(args.host, servers[-1].server_port))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            print('{}:{}: {} requests, {} failures injected, {} apps active'.format(
+                args.host, server.server_port, server.fake.requests, server.fake.failures,
+                len(server.fake.active)))
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,9 @@
 import os
 import json
 import argparse
-import re
-from collections import defaultdict
-from pprint import pprint as pp
 import copy
+from as_index import ASIndex
+from ipam import IPAM
 
 
 sample_netcfg = {
@@ -43,49 +42,16 @@ sample_netcfg = {
 }
 
 
-def extract_neighb_ip_address(this_router_num, neighb_as_num, speaker=False):
-    neighb_ip_address = '5.{}.{}.'.format(min(this_router_num, neighb_as_num), max(this_router_num, neighb_as_num))
-    if speaker:
-        if this_router_num < neighb_as_num:
-            neighb_ip_address += '2'
-        else:
-            neighb_ip_address += '1'
-    else:
-        if this_router_num > neighb_as_num:
-            neighb_ip_address += '2'
-        else:
-            neighb_ip_address += '1'
-    return neighb_ip_address
+def form_onos_configs(json_topo, as_index=None, ipam=None):
+    # returns SDN AS number -> ONOS network config
+    onos_configs = {}
 
+    if as_index is None:
+        as_index = ASIndex(json_topo)
+    if ipam is None:
+        ipam = IPAM(json_topo, as_index)
 
-def main():
-    parser = argparse.ArgumentParser(description='form GSN3 quagga router BGP configs')
-    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input GNS3 topology description', required=True)
-    parser.add_argument('-o', '--output', dest='output_router_configs', type=str, help='directory with output router configs', default='./sample_onos_configs')
-    args = parser.parse_args()
-
-    with open(args.input_topo_file, 'r') as f:
-        json_topo = json.load(f)
-
-    if not os.path.isdir(args.output_router_configs):
-        os.mkdir(args.output_router_configs)
-
-    router_neighbs = defaultdict(set)
-    for as_link in sorted(json_topo['as-links']):
-        r = re.match('^AS(\d+)-AS(\d+)$', as_link)
-        if r:
-            src_as_num = int(r.group(1))
-            dst_as_num = int(r.group(2))
-            router_neighbs[src_as_num].add(dst_as_num)
-            # reverse link
-            if src_as_num not in router_neighbs[dst_as_num]:
-                router_neighbs[dst_as_num].add(src_as_num)
-
-    sdn_nodes = []
-    for node in json_topo['as-nodes']:
-        neigh_num = int(node.split('AS')[1])
-        if json_topo['as-nodes']['AS{}'.format(neigh_num)]['SDN']:
-            sdn_nodes.append(neigh_num)
+    sdn_nodes = [asn for asn in as_index.asns if as_index.is_sdn(asn)]
 
     for router in sdn_nodes:
         onos_cfg = copy.deepcopy(sample_netcfg)
@@ -94,9 +60,9 @@ def main():
         artemis = apps['org.onosproject.artemis']['artemis']
 
         for node in sdn_nodes:
-            if router == node:
+            if router == node or not as_index.is_exa(node):
                 continue
-            artemis['monitors']['exabgp'].append('100.0.0.{}:5000'.format(node * 2))
+            artemis['monitors']['exabgp'].append('{}:5000'.format(ipam.fabric_address('EXA{}'.format(node))))
 
         artemis['prefixes'] = {
                 'moas': [],
@@ -104,29 +70,30 @@ def main():
                     'origin': '{}'.format(router),
                     'neighbor': []
                 },
-                'prefix': '100.{}.0.0/23'.format(router)
+                'prefix': ipam.host_prefix(router)
             }
 
         neighbors = artemis['prefixes']['paths']['neighbor']
 
         ipLocalPrefixes = apps['org.onosproject.reactive.routing']['reactiveRouting']['ip4LocalPrefixes']
         ipLocalPrefixes.append({
-            'ipPrefix': '10.{}.0.0/23'.format(router),
+            'ipPrefix': ipam.host_prefix(router),
             'type': 'PUBLIC',
-            'gatewayIp': '10.{}.0.1'.format(router)
+            'gatewayIp': ipam.host_gateway(router)
             })
 
         peers = []
-        for neighbor in router_neighbs[router]:
-            ip = extract_neighb_ip_address(router, neighbor, speaker=True)
+        for (neighbor, role) in as_index.neighbors_of(router):
+            # the neighbor's side of the link, reached through the AS OVS
+            ip = ipam.as_link_address(neighbor, router)
 
             ipLocalPrefixes.append({
-                'ipPrefix': '{}/30'.format(ip),
+                'ipPrefix': '{}/{}'.format(ip, ipam.pools['as-link'].prefixlen),
                 'type': 'PRIVATE',
                 'gatewayIp': '{}'.format(ip)
                 })
 
-            ip = extract_neighb_ip_address(router, neighbor, speaker=False)
+            ip = ipam.as_link_address(router, neighbor)
             peers.append(ip)
 
             neighbors.append({
@@ -148,14 +115,36 @@ def main():
            "interfaces" : [
                     {
                         'name' : 'sw1-1',
-                        'ips'  : [ '10.{}.0.0/23'.format(router) ],
+                        'ips'  : [ ipam.host_prefix(router) ],
                         'mac'  : 'bb:bb:bb:bb:bb:bb'
                     } 
                ]
            }
 
-        with open('{}/onos{}_netcfg.conf'.format(args.output_router_configs, router), 'w') as f:
-            f.write(json.dumps(onos_cfg))
+        onos_configs[router] = onos_cfg
+
+    return onos_configs
+
+
+def write_onos_configs(output_dir, onos_configs):
+    if not os.path.isdir(output_dir):
+        os.mkdir(output_dir)
+
+    for router in onos_configs:
+        with open('{}/onos{}_netcfg.conf'.format(output_dir, router), 'w') as f:
+            f.write(json.dumps(onos_configs[router]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='form GSN3 quagga router BGP configs')
+    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input GNS3 topology description', required=True)
+    parser.add_argument('-o', '--output', dest='output_router_configs', type=str, help='directory with output router configs', default='./sample_onos_configs')
+    args = parser.parse_args()
+
+    with open(args.input_topo_file, 'r') as f:
+        json_topo = json.load(f)
+
+    write_onos_configs(args.output_router_configs, form_onos_configs(json_topo))
 
 
 if __name__ == '__main__':
@@ -1,330 +1,335 @@
 #!/usr/bin/python3
 
 import os
-import stat
 import json
 import argparse
 import re
-import copy
-
+from concurrent.futures import ProcessPoolExecutor
+from as_index import ASIndex
+from addressing import router_id, MONITOR_ADDRESS, CONTROLLER_ADDRESS
+from ipam import IPAM
+
+
+ZEBRA_CONF = '! Configuration for zebra (NB: it is the same for all routers)\n!\nhostname zebra\npassword sdnip\nlog stdout'
+DISABLE_RP_FILTER = ('#!/bin/sh\n\n'
+                     'echo 0 > "/proc/sys/net/ipv4/conf/$IFACE/rp_filter"\n'
+                     'echo 0 > "/proc/sys/net/ipv4/conf/all/rp_filter"\n'
+                     'echo 0 > "/proc/sys/net/ipv4/conf/default/rp_filter"\n')
+
+
+# Static parts of every bgpd.conf. They are split on their single placeholder once,
+# at import time, so rendering a router only joins the chunks around its ASN and
+# appends the per-neighbor lines; only the short header is formatted per router.
+HEADER_TEMPLATE = (
+    '!\n\n! credentials\nhostname bgp\npassword sdnip\n'
+    '\n!\n! BGP configuration\n'
+    '! Example from: http://www.macfreek.nl/memory/BGP_Configuration\n'
+    'router bgp {asn}\n'
+    '\tbgp router-id {router_id}\n'
+    '\n\t! announced networks\n\tnetwork {network}\n'
+    '\n\t! timers\n\ttimers bgp 1 3\n'
+    '\n\t! inbound/outbound policy\n'
+    '\tneighbor UPSTREAM peer-group\n'
+    '\tneighbor UPSTREAM route-map RM-UPSTREAM-IN in\n'
+    '\tneighbor UPSTREAM route-map RM-PROVIDER-OUT out\n'
+    '\tneighbor UPSTREAM next-hop-self\n'
+)
+BACKUP_GROUP_TEMPLATE = (
+    '\tneighbor BACKUP{neighb} peer-group\n'
+    '\tneighbor BACKUP{neighb} route-map RM-BACKUP-PROVIDER{neighb}-IN in\n'
+    '\tneighbor BACKUP{neighb} route-map RM-BACKUP-PROVIDER{neighb}-OUT out\n'
+    '\tneighbor BACKUP{neighb} next-hop-self\n'
+)
+PEER_GROUPS = (
+    '\tneighbor PEER peer-group\n'
+    '\tneighbor PEER route-map RM-PEER-IN in\n'
+    '\tneighbor PEER route-map RM-PROVIDER-OUT out\n'
+    '\tneighbor PEER next-hop-self\n'
+    '\tneighbor CUSTOMER peer-group\n'
+    '\tneighbor CUSTOMER route-map RM-CUSTOMER-IN in\n'
+    '\tneighbor CUSTOMER next-hop-self\n'
+    '\tneighbor MONITOR peer-group\n'
+    '\tneighbor MONITOR route-map RM-MONITOR-IN in\n'
+    '\tneighbor MONITOR next-hop-self\n'
+)
+POLICY_TEMPLATE = (
+    '\n! Local Preferences:\n'
+    '! We prefer traffic via customers (thay pay for it), otherwise via peers,\n'
+    '! and via providers only as a last resort (since we pay for that)\n'
+    '! 75  custom (lowered) preference, may be configured by customers, peers or providers using community 2075\n'
+    '! 80  providers (low preference)\n'
+    '! 85  custom (lowered) preference, may be configured by customers or peers using community 2085\n'
+    '! 90  peers (medium preference)\n'
+    '! 95  custom (lowered) preference, may be configured by customers using community 2095\n'
+    '! 100 customers (high preferences)\n'
+    '\n! Communities:\n'
+    '! We allow neighbours to announce routing entries to use with a community value that signifies\n'
+    '! that it is a low-preference route. This can be useful for backup connections which are not\n'
+    '! to be used unless there really is no other option. We never allow neighbours to set a higher\n'
+    '! preference: that is something we decide upon. The reason we graciously allow lower preferences\n'
+    '! is that we rather receive announcements with low preference than no announcement at all.\n'
+    '! {asn}:2075  (as sent by others): request to set local preference to 75\n'
+    '! {asn}:2085  (as sent by others): request to set local preference to 85\n'
+    '! {asn}:2095  (as sent by others): request to set local preference to 95\n'
+    '!\n'
+    '! {asn}:3080  (set by ourself): announcement learnt from upstream provider\n'
+    '! {asn}:3090  (set by ourself): announcement learnt from peer\n'
+    '! {asn}:3100  (set by ourself): announcement learnt from customer\n'
+    '! (note: our own routes have no community set)\n'
+    '\n! Route map for upstream providers.\n'
+    '! Block bogon IPs, make entry as coming from upstream using community 3080, and\n'
+    '! set low local-preference\n'
+    '! optionally allow the neighbour to lower to local preference even more (to 75)\n'
+    'route-map RM-UPSTREAM-IN deny 10\n'
+    '\tmatch ip address prefix-list private-ip\n'
+    'route-map RM-UPSTREAM-IN permit 20\n'
+    '\tset community {asn}:3080 additive\n'
+    '\tset local-preference 80\n'
+    '\ton-match next\n'
+    'route-map RM-UPSTREAM-IN permit 30\n'
+    '\tmatch community localpref75\n'
+    '\tset local-preference 75\n'
+    'route-map RM-UPSTREAM-IN permit 40\n'
+    '\t! empty route map entry, make sure all non-matching entries pass this filter\n'
+    '\n! Route map for peers.\n'
+    '! Block bogon IPs, make entry as coming from upstream using community 3090, and\n'
+    '! set medium local-preference\n'
+    '! optionally allow peers to lower to local preference (to 75 or 85)\n'
+    'route-map RM-PEER-IN deny 10\n'
+    '\tmatch ip address prefix-list private-ip\n'
+    '\troute-map RM-PEER-IN permit 20\n'
+    '\tset community {asn}:3090 additive\n'
+    '\tset local-preference 90\n'
+    '\ton-match next\n'
+    'route-map RM-PEER-IN permit 30\n'
+    '\tmatch community localpref75\n'
+    '\tset local-preference 75\n'
+    'route-map RM-PEER-IN permit 40\n'
+    '\tmatch community localpref85\n'
+    '\tset local-preference 85\n'
+    'route-map RM-PEER-IN permit 50\n'
+    '\t! empty route map entry, make sure all non-matching entries pass this filter\n'
+    '\n! Outgoing filters for peers and transit providers.\n'
+    '! Filter routes from other peers (we don\'t provide transit for them), only announce\n'
+    '! our own routes and customer routes.\n'
+    'route-map RM-PROVIDER-OUT deny 10\n'
+    '\t! filter out route entries learnt from peers and upstream providers\n'
+    '\tmatch community providers\n'
+    'route-map RM-PROVIDER-OUT permit 20\n'
+    '\t! empty route map entry, make sure all non-matching entries pass this filter\n'
+    '\n! Route map for customers.\n'
+    '! Block bogon IPs, make entry as coming from upstream using community 3100, and\n'
+    '! set a high local-preference\n'
+    '! optionally allow peers to lower to local preference (to 75, 85 or 95)\n'
+    'route-map RM-CUSTOMER-IN deny 10\n'
+    '\tmatch ip address prefix-list private-ip\n'
+    'route-map RM-CUSTOMER-IN permit 20\n'
+    '\tset community {asn}:3100 additive\n'
+    '\tset local-preference 100\n'
+    '\ton-match next\n'
+    'route-map RM-CUSTOMER-IN permit 30\n'
+    '\tmatch community localpref75\n'
+    '\tset local-preference 75\n'
+    'route-map RM-CUSTOMER-IN permit 40\n'
+    '\tmatch community localpref85\n'
+    '\tset local-preference 85\n'
+    'route-map RM-CUSTOMER-IN permit 50\n'
+    '\tmatch community localpref95\n'
+    '\tset local-preference 95\n'
+    'route-map RM-CUSTOMER-IN permit 60\n'
+    '\n! Route map for BGP monitors.\n'
+    '! Block all incoming advertisements\n'
+    'route-map RM-MONITOR-IN deny 10\n'
+    '\n! community list matching route entries learnt from peers and upstream providers\n'
+    'ip community-list standard providers permit {asn}:3080\n'
+    'ip community-list standard providers permit {asn}:3090\n'
+    'ip community-list standard providers deny\n'
+    '\n! community list matching lower preference requests\n'
+    'ip community-list standard localpref75 permit {asn}:2075\n'
+    'ip community-list standard localpref85 permit {asn}:2085\n'
+    'ip community-list standard localpref95 permit {asn}:2095\n'
+)
+BACKUP_IN_TEMPLATE = (
+    '\n! Incoming route map from backup: Set local preference to a low 75.\n'
+    'route-map RM-BACKUP-PROVIDER{neighb}-IN permit 10\n'
+    '\t! apply regular route map for upstream providers\n'
+    '\t! Calling other route maps requires Quagga 0.96.5 or higher.\n'
+    '\tcall RM-UPSTREAM-IN\n'
+    '\ton-match next\n'
+    'route-map RM-BACKUP-PROVIDER{neighb}-IN permit 20\n'
+    '\t! lower local-preference from 80 to 75 for backup connections\n'
+    '\tset local-preference 75\n'
+)
+BACKUP_OUT_TEMPLATE = (
+    '\n! Outgoing route map for backup connections\n'
+    '! Ask peer to set their local preference to a low 75.\n'
+    'route-map RM-BACKUP-PROVIDER{neighb}-OUT permit 10\n'
+    '\t! apply regular route map for upstream providers\n'
+    '\tcall RM-PROVIDER-OUT\n'
+    '\ton-match next\n'
+    'route-map RM-BACKUP-PROVIDER{neighb}-OUT permit 20\n'
+    '\t! set community that asks AS {neighb} to use a lower preference.\n'
+    '\t! communities are send, but since we don\'t add but replace the community here,\n'
+    '\t! private communities such as 3XXX are never announced to neighbors.\n'
+    '\tset community {neighb}:2075\n'
+)
+PREFIX_LISTS = (
+    '\n! Prefix list matching private IP ranges, bogons, and other suspicious IP range announcements.\n'
+    '! Any \'permit\' here is a match (not really a \'permit\') which is BLOCKED in incoming route map.\n'
+    '! Note: The le 32 also filters subnets of these bogon ranges. However, neigbours can still\n'
+    '! announce a large supernet which contains a bogon range (e.g. 169.254.0.0/15). So you likely\n'
+    '! want to do additional per-neighbour filtering, or peer with known bogon black hole servers.\n'
+    'ip prefix-list private-ip description Private ranges, large or small IP ranges\n'
+    'ip prefix-list private-ip permit 0.0.0.0/8 le 32\n'
+    '! no filtering on 10.0.0.0 range for demo network\n'
+    '!ip prefix-list private-ip permit 10.0.0.0/8 le 32\n'
+    'ip prefix-list private-ip permit 127.0.0.0/8 le 32\n'
+    'ip prefix-list private-ip permit 169.254.0.0/16 le 32\n'
+    'ip prefix-list private-ip permit 172.16.0.0/12 le 32\n'
+    'ip prefix-list private-ip permit 192.0.2.0/24 le 32\n'
+    'ip prefix-list private-ip permit 192.168.0.0/16 le 32\n'
+    'ip prefix-list private-ip permit 240.0.0.0/4 le 32\n'
+    '! filter more specifics\n'
+    'ip prefix-list private-ip permit 0.0.0.0/0 ge 26\n'
+    'ip prefix-list private-ip deny any\n'
+    '\n!\nlog stdout'
+)
+
+NEIGHBOR_LINES = ('\tneighbor {ip} remote-as {asn}\n'
+                  '\tneighbor {ip} peer-group {group}\n'
+                  '\tneighbor {ip} description {description} AS {asn}\n')
+
+
+def compile_template(template, field):
+    return template.split('{' + field + '}')
+
+
+BACKUP_GROUP_CHUNKS = compile_template(BACKUP_GROUP_TEMPLATE, 'neighb')
+POLICY_CHUNKS = compile_template(POLICY_TEMPLATE, 'asn')
+BACKUP_IN_CHUNKS = compile_template(BACKUP_IN_TEMPLATE, 'neighb')
+BACKUP_OUT_CHUNKS = compile_template(BACKUP_OUT_TEMPLATE, 'neighb')
+
+
+def neighbor_section(title, neighbors, group, description, none_comment):
+    parts = ['\n\t! {}\n'.format(title)]
+    for (neighb_as_num, ip) in neighbors:
+        parts.append(NEIGHBOR_LINES.format(ip=ip,
+                                           asn=neighb_as_num,
+                                           group=group.format(neighb_as_num),
+                                           description=description))
+    if len(neighbors) == 0:
+        parts.append('\t! {}\n'.format(none_comment))
+    return ''.join(parts)
+
+
+def render_router_config(router_num, router_id, network, upstreams, backups, peers, customers, exa, sdn):
+    # [(neighbor AS number, neighbor address)] per role, as seen from this router
+    asn = str(router_num)
+
+    parts = [HEADER_TEMPLATE.format(asn=asn, router_id=router_id, network=network)]
+    for (neighb_as_num, ip) in backups:
+        parts.append(str(neighb_as_num).join(BACKUP_GROUP_CHUNKS))
+    parts.append(PEER_GROUPS)
+
+    parts.append(neighbor_section('primary upstream providers', upstreams, 'UPSTREAM',
+                                  'Primary Transit Provider', 'no primary upstream providers'))
+    parts.append(neighbor_section('backup providers', backups, 'BACKUP{}',
+                                  'Backup Transit Provider', 'no backup upstream providers'))
+    parts.append(neighbor_section('peers', peers, 'PEER', 'Peer', 'no peers'))
+    parts.append(neighbor_section('customers', customers, 'CUSTOMER', 'Customer', 'no customers'))
+
+    parts.append('\n\t! monitors\n')
+    if exa:
+        parts.append('\tneighbor {} remote-as {}\n'.format(MONITOR_ADDRESS, router_num))
+    else:
+        parts.append('\t! no monitors\n')
 
-def extract_neighb_ip_address(this_router_num, neighb_as_num):
-    neighb_ip_address = '5.{}.{}.'.format(min(this_router_num, neighb_as_num), max(this_router_num, neighb_as_num))
-    if this_router_num < neighb_as_num:
-        neighb_ip_address += '2'
+    parts.append('\n\t! sdn controller\n')
+    if sdn:
+        parts.append('\tneighbor {} remote-as {}\n'.format(CONTROLLER_ADDRESS, router_num))
+        parts.append('\tneighbor {} port 2000\n'.format(CONTROLLER_ADDRESS))
     else:
-        neighb_ip_address += '1'
+        parts.append('\t! no sdn controller\n')
 
-    return neighb_ip_address
+    parts.append(asn.join(POLICY_CHUNKS))
+    for (neighb_as_num, ip) in backups:
+        parts.append(str(neighb_as_num).join(BACKUP_IN_CHUNKS))
+    for (neighb_as_num, ip) in backups:
+        parts.append(str(neighb_as_num).join(BACKUP_OUT_CHUNKS))
+    parts.append(PREFIX_LISTS)
 
+    return ''.join(parts)
 
-def main():
-    parser = argparse.ArgumentParser(description='form GSN3 quagga router BGP configs')
-    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input GNS3 topology description', required=True)
-    parser.add_argument('-o', '--output', dest='output_router_configs', type=str, help='directory with output router configs', default='./sample_router_configs')
-    args = parser.parse_args()
 
-    with open(args.input_topo_file, 'r') as f:
-        json_topo = json.load(f)
+def render_router_job(job):
+    return render_router_config(*job)
+
 
-    if not os.path.isdir(args.output_router_configs):
-        os.mkdir(args.output_router_configs)
+def form_router_configs(json_topo, workers=1, as_index=None, ipam=None):
+    # returns router node -> bgpd.conf content
+    if as_index is None:
+        as_index = ASIndex(json_topo)
+    if ipam is None:
+        ipam = IPAM(json_topo, as_index)
 
-    router_neighbs = {}
     router_config = {}
     for node in sorted(json_topo['gns3-nodes']):
-        if re.match('^R\d+$', node):
-            router_neighbs[node] = {}
+        if re.match(r'^R\d+$', node):
             router_config[node] = ''
 
-    for as_link in sorted(json_topo['as-links']):
-        r = re.match('^AS(\d+)-AS(\d+)$', as_link)
-        if r:
-            src_as_num = int(r.group(1))
-            dst_as_num = int(r.group(2))
-            src_router = 'R{}'.format(src_as_num)
-            dst_router = 'R{}'.format(dst_as_num)
-            router_neighbs[src_router][dst_router] = copy.deepcopy(json_topo['as-links'][as_link])
-            # reverse link
-            if src_router not in router_neighbs[dst_router]:
-                router_neighbs[dst_router][src_router] = copy.deepcopy(json_topo['as-links'][as_link])
-                router_neighbs[dst_router][src_router]['rel'] = router_neighbs[dst_router][src_router]['rel'][::-1]
-                router_neighbs[dst_router][src_router]['backup'] = 'no'
-
-    for node in sorted(router_config):
+    # render every router on its own; chunks are dealt out in order, so the result is
+    # the same whatever the number of workers
+    nodes = sorted(router_config)
+    jobs = []
+    for node in nodes:
         router_num = int(node.split('R')[1])
+        roles = [[(neighb_as_num, ipam.as_link_address(neighb_as_num, router_num)) for neighb_as_num in neighbs]
+                 for neighbs in as_index.role_lists(router_num)]
+        jobs.append((router_num, router_id(router_num), ipam.host_prefix(router_num)) + tuple(roles) +
+                    (as_index.is_exa(router_num), as_index.is_sdn(router_num)))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rendered = list(executor.map(render_router_job, jobs,
+                                         chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        rendered = [render_router_job(job) for job in jobs]
+
+    for (node, conf) in zip(nodes, rendered):
+        router_config[node] = conf
+
+    return router_config
 
-        # find upstreams, backups, peers, customers and monitors
-        (upstreams, backups, peers, customers, monitors) = (set(), set(), set(), set(), set())
-        for neighb_router in router_neighbs[node]:
-            neighb_as_num = int(neighb_router.split('R')[1])
-            if router_neighbs[node][neighb_router]['rel'] == 'c2p':
-                if router_neighbs[node][neighb_router]['backup'] == 'yes':
-                    backups.add(neighb_as_num)
-                else:
-                    upstreams.add(neighb_as_num)
-            elif router_neighbs[node][neighb_router]['rel'] == 'p2p':
-                peers.add(neighb_as_num)
-            elif router_neighbs[node][neighb_router]['rel'] == 'p2c':
-                customers.add(neighb_as_num)
-
-        # Init conf
-        router_config[node] += '!\n\n! credentials\nhostname bgp\npassword sdnip\n'
-        router_config[node] += '\n!\n! BGP configuration\n'
-        router_config[node] += '! Example from: http://www.macfreek.nl/memory/BGP_Configuration\n'
-
-        # Router BGP conf
-        router_config[node] += 'router bgp {}\n'.format(router_num)
-        router_config[node] += '\tbgp router-id {}.{}.{}.{}\n'.format(router_num,
-                                                                      router_num,
-                                                                      router_num,
-                                                                      router_num)
-        router_config[node] += '\n\t! announced networks\n\tnetwork 10.{}.0.0/23\n'.format(router_num)
-        router_config[node] += '\n\t! timers\n\ttimers bgp 1 3\n'
-        router_config[node] += '\n\t! inbound/outbound policy\n'
-        router_config[node] += '\tneighbor UPSTREAM peer-group\n'
-        router_config[node] += '\tneighbor UPSTREAM route-map RM-UPSTREAM-IN in\n'
-        router_config[node] += '\tneighbor UPSTREAM route-map RM-PROVIDER-OUT out\n'
-        router_config[node] += '\tneighbor UPSTREAM next-hop-self\n'
-        for neighb_as_num in backups:
-            router_config[node] += '\tneighbor BACKUP{} peer-group\n'.format(neighb_as_num)
-            router_config[node] += '\tneighbor BACKUP{} route-map RM-BACKUP-PROVIDER{}-IN in\n'.format(neighb_as_num, neighb_as_num)
-            router_config[node] += '\tneighbor BACKUP{} route-map RM-BACKUP-PROVIDER{}-OUT out\n'.format(neighb_as_num, neighb_as_num)
-            router_config[node] += '\tneighbor BACKUP{} next-hop-self\n'.format(neighb_as_num)
-        router_config[node] += '\tneighbor PEER peer-group\n'
-        router_config[node] += '\tneighbor PEER route-map RM-PEER-IN in\n'
-        router_config[node] += '\tneighbor PEER route-map RM-PROVIDER-OUT out\n'
-        router_config[node] += '\tneighbor PEER next-hop-self\n'
-        router_config[node] += '\tneighbor CUSTOMER peer-group\n'
-        router_config[node] += '\tneighbor CUSTOMER route-map RM-CUSTOMER-IN in\n'
-        router_config[node] += '\tneighbor CUSTOMER next-hop-self\n'
-        router_config[node] += '\tneighbor MONITOR peer-group\n'
-        router_config[node] += '\tneighbor MONITOR route-map RM-MONITOR-IN in\n'
-        router_config[node] += '\tneighbor MONITOR next-hop-self\n'
-
-        router_config[node] += '\n\t! primary upstream providers\n'
-        for neighb_as_num in upstreams:
-            neighb_router_ip = extract_neighb_ip_address(router_num, neighb_as_num)
-            router_config[node] += '\tneighbor {} remote-as {}\n'.format(neighb_router_ip, neighb_as_num)
-            router_config[node] += '\tneighbor {} peer-group UPSTREAM\n'.format(neighb_router_ip)
-            router_config[node] += '\tneighbor {} description Primary Transit Provider AS {}\n'.format(neighb_router_ip, neighb_as_num)
-        if len(upstreams) == 0:
-            router_config[node] += '\t! no primary upstream providers\n'
-
-        router_config[node] += '\n\t! backup providers\n'
-        for neighb_as_num in backups:
-            neighb_router_ip = extract_neighb_ip_address(router_num, neighb_as_num)
-            router_config[node] += '\tneighbor {} remote-as {}\n'.format(neighb_router_ip, neighb_as_num)
-            router_config[node] += '\tneighbor {} peer-group BACKUP{}\n'.format(neighb_router_ip, neighb_as_num)
-            router_config[node] += '\tneighbor {} description Backup Transit Provider AS {}\n'.format(neighb_router_ip, neighb_as_num)
-        if len(backups) == 0:
-            router_config[node] += '\t! no backup upstream providers\n'
-
-        router_config[node] += '\n\t! peers\n'
-        for neighb_as_num in peers:
-            neighb_router_ip = extract_neighb_ip_address(router_num, neighb_as_num)
-            router_config[node] += '\tneighbor {} remote-as {}\n'.format(neighb_router_ip, neighb_as_num)
-            router_config[node] += '\tneighbor {} peer-group PEER\n'.format(neighb_router_ip)
-            router_config[node] += '\tneighbor {} description Peer AS {}\n'.format(neighb_router_ip, neighb_as_num)
-        if len(peers) == 0:
-            router_config[node] += '\t! no peers\n'
-
-        router_config[node] += '\n\t! customers\n'
-        for neighb_as_num in customers:
-            neighb_router_ip = extract_neighb_ip_address(router_num, neighb_as_num)
-            router_config[node] += '\tneighbor {} remote-as {}\n'.format(neighb_router_ip, neighb_as_num)
-            router_config[node] += '\tneighbor {} peer-group CUSTOMER\n'.format(neighb_router_ip)
-            router_config[node] += '\tneighbor {} description Customer AS {}\n'.format(neighb_router_ip, neighb_as_num)
-        if len(customers) == 0:
-            router_config[node] += '\t! no customers\n'
-
-        router_config[node] += '\n\t! monitors\n'
-        if json_topo['as-nodes']['AS{}'.format(router_num)]['EXA']:
-            router_config[node] += '\tneighbor 3.0.0.2 remote-as {}\n'.format(router_num)
-        else:
-            router_config[node] += '\t! no monitors\n'
-
-        router_config[node] += '\n\t! sdn controller\n'
-        if json_topo['as-nodes']['AS{}'.format(router_num)]['SDN']:
-            router_config[node] += '\tneighbor 4.0.0.1 remote-as {}\n'.format(router_num)
-            router_config[node] += '\tneighbor 4.0.0.1 port 2000\n'
-        else:
-            router_config[node] += '\t! no sdn controller\n'
-
-        # Local Pref explanation
-        router_config[node] += '\n! Local Preferences:\n'
-        router_config[node] += '! We prefer traffic via customers (thay pay for it), otherwise via peers,\n'
-        router_config[node] += '! and via providers only as a last resort (since we pay for that)\n'
-        router_config[node] += '! 75  custom (lowered) preference, may be configured by customers, peers or providers using community 2075\n'
-        router_config[node] += '! 80  providers (low preference)\n'
-        router_config[node] += '! 85  custom (lowered) preference, may be configured by customers or peers using community 2085\n'
-        router_config[node] += '! 90  peers (medium preference)\n'
-        router_config[node] += '! 95  custom (lowered) preference, may be configured by customers using community 2095\n'
-        router_config[node] += '! 100 customers (high preferences)\n'
-
-        # Community explanation
-        router_config[node] += '\n! Communities:\n'
-        router_config[node] += '! We allow neighbours to announce routing entries to use with a community value that signifies\n'
-        router_config[node] += '! that it is a low-preference route. This can be useful for backup connections which are not\n'
-        router_config[node] += '! to be used unless there really is no other option. We never allow neighbours to set a higher\n'
-        router_config[node] += '! preference: that is something we decide upon. The reason we graciously allow lower preferences\n'
-        router_config[node] += '! is that we rather receive announcements with low preference than no announcement at all.\n'
-        router_config[node] += '! {}:2075  (as sent by others): request to set local preference to 75\n'.format(router_num)
-        router_config[node] += '! {}:2085  (as sent by others): request to set local preference to 85\n'.format(router_num)
-        router_config[node] += '! {}:2095  (as sent by others): request to set local preference to 95\n'.format(router_num)
-        router_config[node] += '!\n'
-        router_config[node] += '! {}:3080  (set by ourself): announcement learnt from upstream provider\n'.format(router_num)
-        router_config[node] += '! {}:3090  (set by ourself): announcement learnt from peer\n'.format(router_num)
-        router_config[node] += '! {}:3100  (set by ourself): announcement learnt from customer\n'.format(router_num)
-        router_config[node] += '! (note: our own routes have no community set)\n'
-
-        # Route Map for upstream providers
-        router_config[node] += '\n! Route map for upstream providers.\n'
-        router_config[node] += '! Block bogon IPs, make entry as coming from upstream using community 3080, and\n'
-        router_config[node] += '! set low local-preference\n'
-        router_config[node] += '! optionally allow the neighbour to lower to local preference even more (to 75)\n'
-        router_config[node] += 'route-map RM-UPSTREAM-IN deny 10\n'
-        router_config[node] += '\tmatch ip address prefix-list private-ip\n'
-        router_config[node] += 'route-map RM-UPSTREAM-IN permit 20\n'
-        router_config[node] += '\tset community {}:3080 additive\n'.format(router_num)
-        router_config[node] += '\tset local-preference 80\n'
-        router_config[node] += '\ton-match next\n'
-        router_config[node] += 'route-map RM-UPSTREAM-IN permit 30\n'
-        router_config[node] += '\tmatch community localpref75\n'
-        router_config[node] += '\tset local-preference 75\n'
-        router_config[node] += 'route-map RM-UPSTREAM-IN permit 40\n'
-        router_config[node] += '\t! empty route map entry, make sure all non-matching entries pass this filter\n'
-
-        # Route Map for peers
-        router_config[node] += '\n! Route map for peers.\n'
-        router_config[node] += '! Block bogon IPs, make entry as coming from upstream using community 3090, and\n'
-        router_config[node] += '! set medium local-preference\n'
-        router_config[node] += '! optionally allow peers to lower to local preference (to 75 or 85)\n'
-        router_config[node] += 'route-map RM-PEER-IN deny 10\n'
-        router_config[node] += '\tmatch ip address prefix-list private-ip\n'
-        router_config[node] += '\troute-map RM-PEER-IN permit 20\n'
-        router_config[node] += '\tset community {}:3090 additive\n'.format(router_num)
-        router_config[node] += '\tset local-preference 90\n'
-        router_config[node] += '\ton-match next\n'
-        router_config[node] += 'route-map RM-PEER-IN permit 30\n'
-        router_config[node] += '\tmatch community localpref75\n'
-        router_config[node] += '\tset local-preference 75\n'
-        router_config[node] += 'route-map RM-PEER-IN permit 40\n'
-        router_config[node] += '\tmatch community localpref85\n'
-        router_config[node] += '\tset local-preference 85\n'
-        router_config[node] += 'route-map RM-PEER-IN permit 50\n'
-        router_config[node] += '\t! empty route map entry, make sure all non-matching entries pass this filter\n'
-
-        # Outgoing Filters for peers and transit providers
-        router_config[node] += '\n! Outgoing filters for peers and transit providers.\n'
-        router_config[node] += '! Filter routes from other peers (we don\'t provide transit for them), only announce\n'
-        router_config[node] += '! our own routes and customer routes.\n'
-        router_config[node] += 'route-map RM-PROVIDER-OUT deny 10\n'
-        router_config[node] += '\t! filter out route entries learnt from peers and upstream providers\n'
-        router_config[node] += '\tmatch community providers\n'
-        router_config[node] += 'route-map RM-PROVIDER-OUT permit 20\n'
-        router_config[node] += '\t! empty route map entry, make sure all non-matching entries pass this filter\n'
-
-        # Route Map for customers
-        router_config[node] += '\n! Route map for customers.\n'
-        router_config[node] += '! Block bogon IPs, make entry as coming from upstream using community 3100, and\n'
-        router_config[node] += '! set a high local-preference\n'
-        router_config[node] += '! optionally allow peers to lower to local preference (to 75, 85 or 95)\n'
-        router_config[node] += 'route-map RM-CUSTOMER-IN deny 10\n'
-        router_config[node] += '\tmatch ip address prefix-list private-ip\n'
-        router_config[node] += 'route-map RM-CUSTOMER-IN permit 20\n'
-        router_config[node] += '\tset community {}:3100 additive\n'.format(router_num)
-        router_config[node] += '\tset local-preference 100\n'
-        router_config[node] += '\ton-match next\n'
-        router_config[node] += 'route-map RM-CUSTOMER-IN permit 30\n'
-        router_config[node] += '\tmatch community localpref75\n'
-        router_config[node] += '\tset local-preference 75\n'
-        router_config[node] += 'route-map RM-CUSTOMER-IN permit 40\n'
-        router_config[node] += '\tmatch community localpref85\n'
-        router_config[node] += '\tset local-preference 85\n'
-        router_config[node] += 'route-map RM-CUSTOMER-IN permit 50\n'
-        router_config[node] += '\tmatch community localpref95\n'
-        router_config[node] += '\tset local-preference 95\n'
-        router_config[node] += 'route-map RM-CUSTOMER-IN permit 60\n'
-
-        # Route Map for BGP monitors
-        router_config[node] += '\n! Route map for BGP monitors.\n'
-        router_config[node] += '! Block all incoming advertisements\n'
-        router_config[node] += 'route-map RM-MONITOR-IN deny 10\n'
-
-        # Community matches
-        router_config[node] += '\n! community list matching route entries learnt from peers and upstream providers\n'
-        router_config[node] += 'ip community-list standard providers permit {}:3080\n'.format(router_num)
-        router_config[node] += 'ip community-list standard providers permit {}:3090\n'.format(router_num)
-        router_config[node] += 'ip community-list standard providers deny\n'
-        router_config[node] += '\n! community list matching lower preference requests\n'
-        router_config[node] += 'ip community-list standard localpref75 permit {}:2075\n'.format(router_num)
-        router_config[node] += 'ip community-list standard localpref85 permit {}:2085\n'.format(router_num)
-        router_config[node] += 'ip community-list standard localpref95 permit {}:2095\n'.format(router_num)
-
-        # Incoming Route Map for backup provider(s)
-        for neighb_as_num in backups:
-            router_config[node] += '\n! Incoming route map from backup: Set local preference to a low 75.\n'
-            router_config[node] += 'route-map RM-BACKUP-PROVIDER{}-IN permit 10\n'.format(neighb_as_num)
-            router_config[node] += '\t! apply regular route map for upstream providers\n'
-            router_config[node] += '\t! Calling other route maps requires Quagga 0.96.5 or higher.\n'
-            router_config[node] += '\tcall RM-UPSTREAM-IN\n'
-            router_config[node] += '\ton-match next\n'
-            router_config[node] += 'route-map RM-BACKUP-PROVIDER{}-IN permit 20\n'.format(neighb_as_num)
-            router_config[node] += '\t! lower local-preference from 80 to 75 for backup connections\n'
-            router_config[node] += '\tset local-preference 75\n'
-
-        # Outgoing Route Map for backup provider(s)
-        for neighb_as_num in backups:
-            router_config[node] += '\n! Outgoing route map for backup connections\n'
-            router_config[node] += '! Ask peer to set their local preference to a low 75.\n'
-            router_config[node] += 'route-map RM-BACKUP-PROVIDER{}-OUT permit 10\n'.format(neighb_as_num)
-            router_config[node] += '\t! apply regular route map for upstream providers\n'
-            router_config[node] += '\tcall RM-PROVIDER-OUT\n'
-            router_config[node] += '\ton-match next\n'
-            router_config[node] += 'route-map RM-BACKUP-PROVIDER{}-OUT permit 20\n'.format(neighb_as_num)
-            router_config[node] += '\t! set community that asks AS {} to use a lower preference.\n'.format(neighb_as_num)
-            router_config[node] += '\t! communities are send, but since we don\'t add but replace the community here,\n'
-            router_config[node] += '\t! private communities such as 3XXX are never announced to neighbors.\n'
-            router_config[node] += '\tset community {}:2075\n'.format(neighb_as_num)
-
-        # Prefix Lists
-        router_config[node] += '\n! Prefix list matching private IP ranges, bogons, and other suspicious IP range announcements.\n'
-        router_config[node] += '! Any \'permit\' here is a match (not really a \'permit\') which is BLOCKED in incoming route map.\n'
-        router_config[node] += '! Note: The le 32 also filters subnets of these bogon ranges. However, neigbours can still\n'
-        router_config[node] += '! announce a large supernet which contains a bogon range (e.g. 169.254.0.0/15). So you likely\n'
-        router_config[node] += '! want to do additional per-neighbour filtering, or peer with known bogon black hole servers.\n'
-        router_config[node] += 'ip prefix-list private-ip description Private ranges, large or small IP ranges\n'
-        router_config[node] += 'ip prefix-list private-ip permit 0.0.0.0/8 le 32\n'
-        router_config[node] += '! no filtering on 10.0.0.0 range for demo network\n'
-        router_config[node] += '!ip prefix-list private-ip permit 10.0.0.0/8 le 32\n'
-        router_config[node] += 'ip prefix-list private-ip permit 127.0.0.0/8 le 32\n'
-        router_config[node] += 'ip prefix-list private-ip permit 169.254.0.0/16 le 32\n'
-        router_config[node] += 'ip prefix-list private-ip permit 172.16.0.0/12 le 32\n'
-        router_config[node] += 'ip prefix-list private-ip permit 192.0.2.0/24 le 32\n'
-        router_config[node] += 'ip prefix-list private-ip permit 192.168.0.0/16 le 32\n'
-        router_config[node] += 'ip prefix-list private-ip permit 240.0.0.0/4 le 32\n'
-        router_config[node] += '! filter more specifics\n'
-        router_config[node] += 'ip prefix-list private-ip permit 0.0.0.0/0 ge 26\n'
-        router_config[node] += 'ip prefix-list private-ip deny any\n'
-
-        # End conf
-        router_config[node] += '\n!\nlog stdout'
-
-    with open('{}/zebra.conf'.format(args.output_router_configs), 'w') as f:
-        f.write('! Configuration for zebra (NB: it is the same for all routers)\n!\nhostname zebra\npassword sdnip\nlog stdout')
-
-    with open('{}/disable_rp_filter'.format(args.output_router_configs), 'w') as f:
-        f.write('#!/bin/sh\n\n')
-        f.write('echo 0 > "/proc/sys/net/ipv4/conf/$IFACE/rp_filter"\n')
-        f.write('echo 0 > "/proc/sys/net/ipv4/conf/all/rp_filter"\n')
-        f.write('echo 0 > "/proc/sys/net/ipv4/conf/default/rp_filter"\n')
-        os.chmod('{}/disable_rp_filter'.format(args.output_router_configs), 0o775)
+
+def write_router_configs(output_dir, router_config):
+    if not os.path.isdir(output_dir):
+        os.mkdir(output_dir)
+
+    with open('{}/zebra.conf'.format(output_dir), 'w') as f:
+        f.write(ZEBRA_CONF)
+
+    with open('{}/disable_rp_filter'.format(output_dir), 'w') as f:
+        f.write(DISABLE_RP_FILTER)
+        os.chmod('{}/disable_rp_filter'.format(output_dir), 0o775)
 
     for node in sorted(router_config):
-        with open('{}/{}_bgpd.conf'.format(args.output_router_configs, node), 'w') as f:
+        with open('{}/{}_bgpd.conf'.format(output_dir, node), 'w') as f:
             f.write(router_config[node])
 
 
+def main():
+    parser = argparse.ArgumentParser(description='form GSN3 quagga router BGP configs')
+    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input GNS3 topology description', required=True)
+    parser.add_argument('-o', '--output', dest='output_router_configs', type=str, help='directory with output router configs', default='./sample_router_configs')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of rendering processes', default=1)
+    args = parser.parse_args()
+
+    with open(args.input_topo_file, 'r') as f:
+        json_topo = json.load(f)
+
+    router_config = form_router_configs(json_topo, workers=args.workers)
+    write_router_configs(args.output_router_configs, router_config)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,257 @@
+#!/usr/bin/python3
+
+import sys
+import json
+import random
+import argparse
+from collections import deque
+
+
+DEFAULT_ASES = 100
+DEFAULT_SEED = 1
+DEFAULT_TIER2_RATIO = 0.1
+DEFAULT_MULTIHOME = 0.3
+DEFAULT_PEERING = 0.2
+DEFAULT_BACKUP = 0.5
+# tier-1 ASes form a full p2p mesh, keep it to the size of the real one by default
+MAX_TIER1 = 16
+
+# CAIDA as-rel codes: "<provider>|<customer>|-1" and "<peer>|<peer>|0"
+CAIDA_P2C = '-1'
+CAIDA_P2P = '0'
+
+
+class AsLinks(object):
+    # unique AS links, each written as 'ASa-ASb' with a < b unless it is a backup, which is
+    # only understood from the customer side ('c2p' with backup 'yes')
+
+    def __init__(self):
+        self.pairs = set()
+        self.degree = {}
+
+    def add(self, customer, provider, rel, backup=False):
+        pair = (min(customer, provider), max(customer, provider))
+        if customer == provider or pair in self.pairs:
+            return None
+        self.pairs.add(pair)
+        self.degree[customer] = self.degree.get(customer, 0) + 1
+        self.degree[provider] = self.degree.get(provider, 0) + 1
+
+        if rel == 'p2p':
+            return (pair[0], pair[1], 'p2p', 'no')
+        if backup:
+            return (customer, provider, 'c2p', 'yes')
+        if customer < provider:
+            return (customer, provider, 'c2p', 'no')
+        return (provider, customer, 'p2c', 'no')
+
+    def has_room(self, asn, max_degree):
+        return max_degree is None or self.degree.get(asn, 0) < max_degree
+
+
+def as_flags(asns, seed, sdn_ratio, exa_ratio):
+    # (asn, SDN, EXA) from their own random stream, so the links do not shift with the ratios
+    rng = random.Random('{}-flags'.format(seed))
+    for asn in asns:
+        yield (asn, rng.random() < sdn_ratio, rng.random() < exa_ratio)
+
+
+def pick(rng, pool, links, max_degree, exclude, tries=32):
+    # preferential attachment: pool holds every AS once per link it already has, plus once
+    for _ in range(tries):
+        if not pool:
+            return None
+        asn = pool[rng.randrange(len(pool))]
+        if asn not in exclude and links.has_room(asn, max_degree):
+            return asn
+    # mostly full pool: drop the ASes without free ports and choose among the rest
+    pool[:] = [asn for asn in pool if links.has_room(asn, max_degree)]
+    candidates = sorted(set(asn for asn in pool if asn not in exclude))
+    return rng.choice(candidates) if candidates else None
+
+
+def tiered_links(num_ases, seed=DEFAULT_SEED, tier1=None, tier2_ratio=DEFAULT_TIER2_RATIO,
+                 multihome=DEFAULT_MULTIHOME, peering=DEFAULT_PEERING, backup=DEFAULT_BACKUP,
+                 max_degree=None):
+    # Tier-1 ASes peer with each other, tier-2 ASes buy transit from tier-1 or older tier-2
+    # ASes and peer among themselves, stubs buy from tier-2 (rarely tier-1). Providers are
+    # chosen by preferential attachment; extra providers of a multihomed AS may be backups.
+    # With max_degree, an AS whose tier has no free ports left buys from any older AS.
+    # Yields (a, b, rel, backup) as the links are made.
+    rng = random.Random(seed)
+    if tier1 is None:
+        tier1 = max(3, min(MAX_TIER1, num_ases // 200))
+    tier1 = min(tier1, num_ases)
+    tier2 = min(num_ases - tier1, max(1, int(num_ases * tier2_ratio)))
+    links = AsLinks()
+
+    top = list(range(1, tier1 + 1))
+    pool_t1 = list(top)
+    pool_t2 = []
+    pool_all = list(top)
+    for (i, asn) in enumerate(top):
+        for other in top[i + 1:]:
+            if links.has_room(asn, max_degree) and links.has_room(other, max_degree):
+                yield links.add(asn, other, 'p2p')
+                pool_t1 += [asn, other]
+
+    def buy_transit(asn, pools):
+        providers = []
+        wanted = 1
+        while wanted < 3 and rng.random() < multihome:
+            wanted += 1
+        for n in range(wanted):
+            pool = pools[0] if len(pools) == 1 or rng.random() < 0.9 or not pools[1] else pools[1]
+            if not pool:
+                pool = pools[-1]
+            provider = pick(rng, pool, links, max_degree, set(providers) | set([asn]))
+            if provider is None and max_degree is not None:
+                provider = pick(rng, pool_all, links, max_degree, set(providers) | set([asn]))
+            if provider is None or not links.has_room(asn, max_degree):
+                break
+            link = links.add(asn, provider, 'c2p', backup=n > 0 and rng.random() < backup)
+            if link is not None:
+                providers.append(provider)
+                pool_all.append(provider)
+                yield link
+        pool_all.extend([asn] * (1 + len(providers)))
+        return providers
+
+    for asn in range(tier1 + 1, tier1 + tier2 + 1):
+        providers = yield from buy_transit(asn, [pool_t1 + pool_t2] if pool_t2 else [pool_t1])
+        for provider in providers:
+            (pool_t1 if provider <= tier1 else pool_t2).append(provider)
+        if pool_t2 and rng.random() < peering:
+            peer = pick(rng, pool_t2, links, max_degree, set(providers) | set([asn]))
+            if peer is not None and links.has_room(asn, max_degree):
+                link = links.add(asn, peer, 'p2p')
+                if link is not None:
+                    pool_t2.append(peer)
+                    yield link
+        pool_t2 += [asn] * (1 + len(providers))
+
+    for asn in range(tier1 + tier2 + 1, num_ases + 1):
+        providers = yield from buy_transit(asn, [pool_t2 or pool_t1, pool_t1])
+        for provider in providers:
+            (pool_t1 if provider <= tier1 else pool_t2).append(provider)
+
+
+def read_caida(path):
+    # [(provider or peer, customer or peer, code)] from a CAIDA as-rel file
+    relations = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            fields = line.strip().split('|')
+            if len(fields) < 3 or fields[2] not in (CAIDA_P2C, CAIDA_P2P):
+                continue
+            relations.append((int(fields[0]), int(fields[1]), fields[2]))
+    return relations
+
+
+def caida_subset(relations, limit):
+    # the first `limit` ASes met in a BFS from the best connected AS
+    adjacency = {}
+    for (a, b, _) in relations:
+        adjacency.setdefault(a, []).append(b)
+        adjacency.setdefault(b, []).append(a)
+    if limit is None or limit >= len(adjacency):
+        return set(adjacency)
+
+    seed = max(sorted(adjacency), key=lambda asn: len(adjacency[asn]))
+    kept = set([seed])
+    queue = deque([seed])
+    while queue and len(kept) < limit:
+        asn = queue.popleft()
+        for neighb in sorted(adjacency[asn], key=lambda neighb: -len(adjacency[neighb])):
+            if neighb not in kept and len(kept) < limit:
+                kept.add(neighb)
+                queue.append(neighb)
+    return kept
+
+
+def caida_links(relations, kept, seed=DEFAULT_SEED, backup=DEFAULT_BACKUP, renumber=None):
+    # yields (a, b, rel, backup); all but the first provider of a multihomed AS may be backups
+    rng = random.Random(seed)
+    links = AsLinks()
+    providers = {}
+    for (a, b, code) in relations:
+        if a not in kept or b not in kept:
+            continue
+        if renumber is not None:
+            (a, b) = (renumber[a], renumber[b])
+        if code == CAIDA_P2P:
+            link = links.add(a, b, 'p2p')
+        else:
+            seen = providers.setdefault(b, 0)
+            providers[b] = seen + 1
+            link = links.add(b, a, 'c2p', backup=seen > 0 and rng.random() < backup)
+        if link is not None:
+            yield link
+
+
+def write_topology(out, name, nodes, links):
+    # stream the topology JSON entry by entry, nothing but the AS links seen so far is kept
+    out.write('{{\n  "project": {},\n  "as-nodes": {{'.format(json.dumps({'name': name})))
+    sep = '\n'
+    for (asn, sdn, exa) in nodes:
+        out.write('{}    "AS{}": {{"SDN": {}, "EXA": {}}}'.format(sep, asn, json.dumps(sdn), json.dumps(exa)))
+        sep = ',\n'
+    out.write('\n  },\n  "as-links": {')
+    sep = '\n'
+    count = 0
+    for (a, b, rel, backup) in links:
+        out.write('{}    "AS{}-AS{}": {{"rel": "{}", "backup": "{}"}}'.format(sep, a, b, rel, backup))
+        sep = ',\n'
+        count += 1
+    out.write('\n  }\n}\n')
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='generate a large AS-level input topology')
+    parser.add_argument('-n', '--ases', dest='ases', type=int, help='number of ASes of a tiered topology', default=DEFAULT_ASES)
+    parser.add_argument('-c', '--caida', dest='caida', type=str, help='CAIDA as-rel file to take the ASes and relationships from')
+    parser.add_argument('-l', '--limit', dest='limit', type=int, help='keep only this many ASes of the CAIDA graph')
+    parser.add_argument('-r', '--renumber', dest='renumber', action='store_true', help='renumber the CAIDA ASes from 1')
+    parser.add_argument('-o', '--output', dest='output', type=str, help='output topology file (- for stdout)', default='-')
+    parser.add_argument('--name', dest='name', type=str, help='GNS3 project name', default='synthetic')
+    parser.add_argument('--seed', dest='seed', type=int, help='random seed', default=DEFAULT_SEED)
+    parser.add_argument('--sdn-ratio', dest='sdn_ratio', type=float, help='share of SDN ASes', default=0.0)
+    parser.add_argument('--exa-ratio', dest='exa_ratio', type=float, help='share of ASes with an ExaBGP monitor', default=0.0)
+    parser.add_argument('--tier1', dest='tier1', type=int, help='number of tier-1 ASes (default: ASes / 200, from 3 to 16)')
+    parser.add_argument('--tier2-ratio', dest='tier2_ratio', type=float, help='share of tier-2 ASes', default=DEFAULT_TIER2_RATIO)
+    parser.add_argument('--multihome', dest='multihome', type=float, help='chance to buy transit from one more provider', default=DEFAULT_MULTIHOME)
+    parser.add_argument('--peering', dest='peering', type=float, help='chance of a tier-2 AS to peer', default=DEFAULT_PEERING)
+    parser.add_argument('--backup', dest='backup', type=float, help='chance an extra provider is a backup', default=DEFAULT_BACKUP)
+    parser.add_argument('--max-degree', dest='max_degree', type=int, help='max inter-AS links per AS of a tiered topology')
+    args = parser.parse_args()
+
+    if args.caida:
+        relations = read_caida(args.caida)
+        kept = caida_subset(relations, args.limit)
+        asns = sorted(kept)
+        renumber = None
+        if args.renumber:
+            renumber = dict((asn, i + 1) for (i, asn) in enumerate(asns))
+            asns = list(range(1, len(asns) + 1))
+        links = caida_links(relations, kept, seed=args.seed, backup=args.backup, renumber=renumber)
+    else:
+        asns = range(1, args.ases + 1)
+        links = tiered_links(args.ases, seed=args.seed, tier1=args.tier1, tier2_ratio=args.tier2_ratio,
+                             multihome=args.multihome, peering=args.peering, backup=args.backup,
+                             max_degree=args.max_degree)
+
+    nodes = as_flags(asns, args.seed, args.sdn_ratio, args.exa_ratio)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        count = write_topology(out, args.name, nodes, links)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print('{} ASes, {} AS links'.format(len(asns), count), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
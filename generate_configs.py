@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+
+import json
+import argparse
+from as_index import ASIndex
+from ipam import IPAM
+from form_iface_configs import form_iface_configs, write_iface_configs
+from form_router_bgp_configs import form_router_configs, write_router_configs
+from form_onos import form_onos_configs, write_onos_configs
+
+
+DEFAULT_IFACE_CONFIGS_DIR = './iface_configs'
+DEFAULT_ROUTER_CONFIGS_DIR = './router_configs'
+DEFAULT_ONOS_CONFIGS_DIR = './onos_configs'
+
+
+def generate_configs(json_topo, render_workers=1):
+    # every generator works on the same in-memory topology, AS relationship index and
+    # address plan; the interface pass fills json_topo['intfs'] before the others run
+    as_index = ASIndex(json_topo)
+    ipam = IPAM(json_topo, as_index)
+    return {
+        'iface': form_iface_configs(json_topo, ipam=ipam),
+        'router': form_router_configs(json_topo, workers=render_workers, as_index=as_index, ipam=ipam),
+        'onos': form_onos_configs(json_topo, as_index=as_index, ipam=ipam)
+    }
+
+
+def write_configs(configs, iface_dir=DEFAULT_IFACE_CONFIGS_DIR, router_dir=DEFAULT_ROUTER_CONFIGS_DIR,
+                  onos_dir=DEFAULT_ONOS_CONFIGS_DIR):
+    write_iface_configs(iface_dir, configs['iface'])
+    write_router_configs(router_dir, configs['router'])
+    write_onos_configs(onos_dir, configs['onos'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='form all GNS3 node configs in one pass')
+    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input GNS3 topology description', required=True)
+    parser.add_argument('-oi', '--output-iface', dest='output_iface_configs', type=str, help='directory with output iface configs', default=DEFAULT_IFACE_CONFIGS_DIR)
+    parser.add_argument('-or', '--output-router', dest='output_router_configs', type=str, help='directory with output router configs', default=DEFAULT_ROUTER_CONFIGS_DIR)
+    parser.add_argument('-oo', '--output-onos', dest='output_onos_configs', type=str, help='directory with output onos configs', default=DEFAULT_ONOS_CONFIGS_DIR)
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of BGP config rendering processes', default=1)
+    args = parser.parse_args()
+
+    with open(args.input_topo_file, 'r') as f:
+        json_topo = json.load(f)
+
+    configs = generate_configs(json_topo, render_workers=args.workers)
+    write_configs(configs, args.output_iface_configs, args.output_router_configs, args.output_onos_configs)
+
+    with open(args.input_topo_file, 'w') as f:
+        json.dump(json_topo, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+
+
+import json
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from readiness import set_status, DEFAULT_TIMEOUT as DEFAULT_READY_TIMEOUT
+from console import ConsoleManager
+import tracing
+
+
+GNS3_PORT = 3080
+DEFAULT_POOL_SIZE = 16
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 60
+RETRY_STATUSES = (500, 502, 503, 504)
+# the server may have applied a POST that timed out or failed with 500/502/504
+POST_RETRY_STATUSES = (503,)
+NODE_DROP_FIELDS = ('x', 'width', 'name', 'label', 'height', 'y', 'status', 'z', 'symbol')
+LINK_DROP_FIELDS = ('capture_file_name', 'capture_file_path', 'capturing', 'suspend', 'filters')
+
+
+class GNS3Error(Exception):
+    pass
+
+
+def reply_json(res, key):
+    # the JSON body of a create call, or None when it does not hold the created object's key
+    try:
+        json_res = res.json()
+    except ValueError:
+        return None
+    if not isinstance(json_res, dict) or key not in json_res:
+        return None
+    return json_res
+
+
+def trim_node(json_node):
+    # keep only the (needed) node data
+    for field in NODE_DROP_FIELDS:
+        del json_node[field]
+    return json_node
+
+
+def trim_link(json_link):
+    # keep only the (needed) link data
+    for field in LINK_DROP_FIELDS:
+        del json_link[field]
+    for node in json_link['nodes']:
+        del node['label']
+    return json_link
+
+
+class GNS3Client(object):
+
+    def __init__(self, host, port=GNS3_PORT, pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.timeout = timeout
+        self.base_url = 'http://{}:{}/v2'.format(host, port)
+        self.project_id = None
+
+        # keep-alive sessions: GET, PUT and DELETE retry connection errors, read timeouts and
+        # transient 5xx; POST creates are not idempotent, so they only retry what never
+        # reached the server (connection errors and 503)
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=None, raise_on_status=False)
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                                  max_retries=retry))
+        post_retry = Retry(total=retries, connect=retries, read=0, status=retries,
+                           backoff_factor=backoff, status_forcelist=POST_RETRY_STATUSES,
+                           allowed_methods=None, raise_on_status=False)
+        self.post_session = requests.Session()
+        self.post_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                                       max_retries=post_retry))
+
+        # endpoint -> [calls, total seconds, failures], for the benchmark's request counts
+        self.timings = {}
+        self.timings_lock = threading.Lock()
+
+        # telnet consoles, opened on first use
+        self.consoles = None
+
+    def set_project(self, project_id):
+        self.project_id = project_id
+        self.project_url = '{}/projects/{}'.format(self.base_url, project_id)
+        self.nodes_url = '{}/nodes'.format(self.project_url)
+        self.links_url = '{}/links'.format(self.project_url)
+
+    def request(self, method, endpoint, url, payload=None):
+        data = None
+        if payload is not None:
+            data = json.dumps(payload)
+
+        start = time.time()
+        failed = True
+        try:
+            session = self.post_session if method == 'POST' else self.session
+            res = session.request(method, url, data=data, timeout=self.timeout)
+            failed = res.status_code >= 400
+            return res
+        finally:
+            elapsed = time.time() - start
+            with self.timings_lock:
+                timing = self.timings.setdefault(endpoint, [0, 0.0, 0])
+                timing[0] += 1
+                timing[1] += elapsed
+                if failed:
+                    timing[2] += 1
+            tracing.record(endpoint, tracing.REST, start, elapsed, failed=failed)
+
+    def close(self):
+        self.session.close()
+        self.post_session.close()
+        if self.consoles is not None:
+            self.consoles.close()
+            self.consoles = None
+
+    def create_project(self, json_topo):
+        res = self.request('POST', 'POST /projects', '{}/projects'.format(self.base_url), {
+            'name': json_topo['project']['name']
+        })
+        json_res = reply_json(res, 'project_id')
+        if json_res is None:
+            raise GNS3Error('request to create GNS3 project {} failed with {}: {}'.format(
+                json_topo['project']['name'], res.status_code, res.text[:200]))
+        json_topo['project']['project_id'] = json_res['project_id']
+        json_topo['project']['path'] = json_res['path']
+        json_topo['project']['filename'] = json_res['filename']
+
+        self.set_project(json_topo['project']['project_id'])
+        return json_topo
+
+    def create_docker_node(self, json_topo={}, name=None, image=None, adapters=1, environment=None,
+                           start_command=None, compute_id='local'):
+        symbol = ':/symbols/docker_guest.svg'
+        if name.startswith('R'):
+            symbol = ':/symbols/router.svg'
+
+        res = self.request('POST', 'POST /nodes', self.nodes_url, {
+            'name': name,
+            'symbol': symbol,
+            'node_type': 'docker',
+            'compute_id': compute_id,
+            'properties': {
+                'image': image,
+                'console_type': 'telnet',
+                'adapters': adapters,
+                'environment': environment,
+                'start_command': start_command
+            }
+        })
+
+        # retrieve (needed) node data
+        json_res = reply_json(res, 'node_id')
+        if json_res is None:
+            raise GNS3Error('request to create GNS3 node {} failed with {}: {}'.format(
+                name, res.status_code, res.text[:200]))
+
+        return trim_node(json_res)
+
+    def create_docker_link(self, json_topo={}, src_hname=None, src_anum=0, dst_hname=None, dst_anum=0):
+        # form link name
+        name = '{}:{}-{}:{}'.format(src_hname,
+                                    src_anum,
+                                    dst_hname,
+                                    dst_anum)
+
+        res = self.request('POST', 'POST /links', self.links_url, {
+            'nodes': [
+                {
+                    'adapter_number': src_anum,
+                    'port_number': 0,
+                    'node_id': json_topo['gns3-nodes'][src_hname]['node_id']
+                },
+                {
+                    'adapter_number': dst_anum,
+                    'port_number': 0,
+                    'node_id': json_topo['gns3-nodes'][dst_hname]['node_id']
+                },
+            ]
+        })
+
+        # retrieve (needed) link data
+        json_res = reply_json(res, 'link_id')
+        if json_res is None:
+            raise GNS3Error('request to create GNS3 link {} failed with {}: {}'.format(
+                name, res.status_code, res.text[:200]))
+
+        return trim_link(json_res)
+
+    def console_address(self, json_topo, node_name):
+        # console port, or (host, port) for nodes placed on another compute
+        node = json_topo['gns3-nodes'][node_name]
+        host = json_topo.get('computes', {}).get(node.get('compute_id'))
+        if host is None:
+            return node['console']
+        return (host, node['console'])
+
+    def node_url(self, json_topo, node_name):
+        return '{}/{}'.format(self.nodes_url, json_topo['gns3-nodes'][node_name]['node_id'])
+
+    def list_nodes(self):
+        return self.request('GET', 'GET /nodes', self.nodes_url).json()
+
+    def list_links(self):
+        return self.request('GET', 'GET /links', self.links_url).json()
+
+    def update_node(self, node_id, properties):
+        res = self.request('PUT', 'PUT /nodes/{id}', '{}/{}'.format(self.nodes_url, node_id), {
+            'properties': properties
+        })
+        json_res = reply_json(res, 'node_id')
+        if json_res is None:
+            raise GNS3Error('request to update GNS3 node {} failed with {}: {}'.format(
+                node_id, res.status_code, res.text[:200]))
+        return trim_node(json_res)
+
+    def delete_node(self, node_id):
+        self.request('DELETE', 'DELETE /nodes/{id}', '{}/{}'.format(self.nodes_url, node_id))
+
+    def delete_link(self, link_id):
+        self.request('DELETE', 'DELETE /links/{id}', '{}/{}'.format(self.links_url, link_id))
+
+    def node_statuses(self):
+        # one call returns the status of every node in the project
+        return dict((node['node_id'], node['status']) for node in self.list_nodes())
+
+    def get_node(self, json_topo, node_name):
+        return self.request('GET', 'GET /nodes/{id}', self.node_url(json_topo, node_name)).json()
+
+    def start_node(self, json_topo, node_name):
+        self.request('POST', 'POST /nodes/{id}/start', '{}/start'.format(self.node_url(json_topo, node_name)), {})
+
+    def stop_node(self, json_topo, node_name):
+        self.request('POST', 'POST /nodes/{id}/stop', '{}/stop'.format(self.node_url(json_topo, node_name)), {})
+
+    def reload_node(self, json_topo, node_name):
+        self.request('POST', 'POST /nodes/{id}/reload', '{}/reload'.format(self.node_url(json_topo, node_name)), {})
+
+    def run_commands(self, json_topo, batches, timeout=DEFAULT_READY_TIMEOUT):
+        # batches: node name -> [commands]; stopped nodes are started for the batch and stopped again.
+        # Raises GNS3Error naming the nodes whose console failed or where a command exited non-zero.
+        statuses = self.node_statuses()
+        stopped = [name for name in batches
+                   if statuses.get(json_topo['gns3-nodes'][name]['node_id']) == 'stopped']
+        if stopped:
+            set_status(self, json_topo, stopped, 'started', timeout=timeout)
+
+        if self.consoles is None:
+            self.consoles = ConsoleManager(json_topo['project']['url'])
+
+        for name in batches:
+            print('\t Running commands on {}'.format(name))
+        results = self.consoles.run_batches(dict(
+            (name, (self.console_address(json_topo, name), batches[name])) for name in batches))
+
+        failed = []
+        for name in sorted(results):
+            if isinstance(results[name], Exception):
+                print('\t Commands on {} failed: {}'.format(name, results[name]))
+                failed.append(name)
+                continue
+            for result in results[name]:
+                if result.status != 0:
+                    print('\t {} on {} exited with {}: {}'.format(result.command, name,
+                                                                 result.status, result.output))
+                    if name not in failed:
+                        failed.append(name)
+
+        if stopped:
+            self.consoles.drop([self.console_address(json_topo, name) for name in stopped])
+            set_status(self, json_topo, stopped, 'stopped', timeout=timeout)
+
+        if failed:
+            raise GNS3Error('console commands failed on {}'.format(', '.join(failed)))
+        return results
+
+    def run_command(self, json_topo, node_name, command, timeout=DEFAULT_READY_TIMEOUT):
+        return self.run_commands(json_topo, {node_name: command}, timeout=timeout)[node_name]
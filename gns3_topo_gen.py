@@ -1,182 +1,192 @@
 #!/usr/bin/python3
 
 
-import sys
 import argparse
-import requests
 import re
-import subprocess
-import time
-import json
-from pprint import pprint as pp
-
-
-PY3_BIN = '/usr/bin/python3'
-IFACE_PY = 'form_iface_configs.py'
-ROUTER_PY = 'form_router_bgp_configs.py'
-CP_PY = 'copy_file_remote.py'
-DEFAULT_IFACE_CONFIGS_DIR = './iface_configs'
-DEFAULT_ROUTER_CONFIGS_DIR = './router_configs'
-RUN_COMMAND_PY = 'run_command.py'
-
-
-def create_docker_node(json_topo={}, name=None, image=None, adapters=1, environment=None, start_command=None):
-    # prepare request
-    url = 'http://{}:3080/v2/projects/{}/nodes'.format(
-        json_topo['project']['url'],
-        json_topo['project']['project_id']
-    )
-
-    headers = {}
-    symbol = ':/symbols/docker_guest.svg'
-    if name.startswith('R'):
-        symbol = ':/symbols/router.svg'
-    payload = json.dumps({
-        'name': name,
-        'symbol': symbol,
-        'node_type': 'docker',
-        'compute_id': 'local',
-        'properties': {
-            'image': image,
-            'console_type': 'telnet',
-            'adapters': adapters,
-            'environment': environment,
-            'start_command': start_command
-        }
-    })
-
-    # execute request
-    res = requests.post(url, data=payload, headers=headers)
-
-    # retrieve (needed) node data
-    try:
-        json_res = res.json()
-        if 'node_id' in json_res:
-            json_topo['gns3-nodes'][name] = json_res
-            del json_topo['gns3-nodes'][name]['x']
-            del json_topo['gns3-nodes'][name]['width']
-            del json_topo['gns3-nodes'][name]['name']
-            del json_topo['gns3-nodes'][name]['label']
-            del json_topo['gns3-nodes'][name]['height']
-            del json_topo['gns3-nodes'][name]['y']
-            del json_topo['gns3-nodes'][name]['status']
-            del json_topo['gns3-nodes'][name]['z']
-            del json_topo['gns3-nodes'][name]['symbol']
-        else:
-            raise
-    except:
-        print('Request to create GNS3 node {} failed with text:'.format(name))
-        pp(res.json())
-        sys.exit(1)
-
-    return json_topo
-
-
-def create_docker_link(json_topo={}, src_hname=None, src_anum=0, dst_hname=None, dst_anum=0):
-    # form link name
-    name = '{}:{}-{}:{}'.format(src_hname,
-                                src_anum,
-                                dst_hname,
-                                dst_anum)
-
-    # prepare request
-    url = 'http://{}:3080/v2/projects/{}/links'.format(
-        json_topo['project']['url'],
-        json_topo['project']['project_id']
-    )
-
-    headers = {}
-    payload = json.dumps({
-        'nodes': [
-            {
-                'adapter_number': src_anum,
-                'port_number': 0,
-                'node_id': json_topo['gns3-nodes'][src_hname]['node_id']
-            },
-            {
-                'adapter_number': dst_anum,
-                'port_number': 0,
-                'node_id': json_topo['gns3-nodes'][dst_hname]['node_id']
-            },
-        ]
-    })
-
-    # execute request
-    res = requests.post(url, data=payload, headers=headers)
-
-    # retrieve (needed) link data
-    try:
-        json_res = res.json()
-        if 'link_id' in json_res:
-            json_topo['gns3-links'][name] = json_res
-            del json_topo['gns3-links'][name]['capture_file_name']
-            del json_topo['gns3-links'][name]['capture_file_path']
-            del json_topo['gns3-links'][name]['capturing']
-            del json_topo['gns3-links'][name]['suspend']
-            del json_topo['gns3-links'][name]['filters']
-            for node in json_topo['gns3-links'][name]['nodes']:
-                del node['label']
-        else:
-            raise
-    except:
-        print('Request to create GNS3 link {} failed with text:'.format(name))
-        pp(res.json())
-        sys.exit(1)
-
-    return json_topo
-
-
-def start_node(json_topo, node_name):
-    # prepare request
-    url = 'http://{}:3080/v2/projects/{}/nodes/{}/start'.format(
-        json_topo['project']['url'],
-        json_topo['project']['project_id'],
-        json_topo['gns3-nodes'][node_name]['node_id']
-    )
-
-    headers = {}
-    payload = json.dumps({})
-    # execute request
-    res = requests.post(url, data=payload, headers=headers)
-
-
-def stop_node(json_topo, node_name):
-    # prepare request
-    url = 'http://{}:3080/v2/projects/{}/nodes/{}/stop'.format(
-        json_topo['project']['url'],
-        json_topo['project']['project_id'],
-        json_topo['gns3-nodes'][node_name]['node_id']
-    )
+import sys
+from gns3_client import GNS3Client, GNS3Error
+from create_engine import plan_build, create_all, DEFAULT_WORKERS
+from checkpoint import Checkpoint, load_topo, write_atomic, DEFAULT_EVERY, DEFAULT_INTERVAL
+from readiness import set_status, ReadinessTimeout, DEFAULT_TIMEOUT
+from transfer import push_files, print_stats, TransferError
+from reconcile import reconcile
+from generate_configs import generate_configs, write_configs
+from form_router_bgp_configs import ZEBRA_CONF, DISABLE_RP_FILTER
+from addressing import CONTROLLER_OPENFLOW_ADDRESS
+from deploy_manifest import load_manifest, plan_deploy, record_deploy, DEFAULT_MANIFEST
+from placement import load_computes, place_nodes, print_placement, compute_hosts, created_pins, PlacementError
+from validate_topo import validate, print_errors
+import tracing
+
+
+# ports eth0-eth15 the gns3/openvswitch image puts on br0 whatever the node's adapters
+OVS_IMAGE_PORTS = 16
+
+
+def config_files(json_topo, configs):
+    # [(node, content, remote path, mode)] for every config file to deploy
+    files = []
+    for node in json_topo['gns3-nodes']:
+        node_dir = '/opt/gns3/projects/{}/project-files/docker/{}'.format(
+            json_topo['project']['project_id'],
+            json_topo['gns3-nodes'][node]['node_id'])
 
-    headers = {}
-    payload = json.dumps({})
-    # execute request
-    res = requests.post(url, data=payload, headers=headers)
+        files.append((node, configs['iface'][node],
+                      '{}/etc/network/interfaces'.format(node_dir), 0o644))
 
+        if re.match(r'^R\d+$', node):
+            files.append((node, ZEBRA_CONF,
+                          '{}/etc/quagga/zebra.conf'.format(node_dir), 0o644))
+            files.append((node, configs['router'][node],
+                          '{}/etc/quagga/bgpd.conf'.format(node_dir), 0o644))
+            files.append((node, DISABLE_RP_FILTER,
+                          '{}/etc/network/if-up.d/disable_rp_filter'.format(node_dir), 0o775))
 
-def run_command(json_topo, node_name, command):
-    url = 'http://{}:3080/v2/projects/{}/nodes/{}'.format(
-        json_topo['project']['url'],
-        json_topo['project']['project_id'],
-        json_topo['gns3-nodes'][node_name]['node_id']
-    )
+    return files
 
-    headers = {}
-    res = requests.get(url, headers=headers)
 
-    if res.json()['status'] == 'stopped':
-        start_node(json_topo, node_name)
-        time.sleep(2)
+def build(args):
+    json_topo = load_topo(args.input_topo_file)
 
-    telnet_ip = json_topo['project']['url']
-    telnet_port = str(json_topo['gns3-nodes'][node_name]['console'])
+    # refuse to build a topology that would only fail halfway through
+    with tracing.span('validate'):
+        errors = validate(json_topo)
+    if errors:
+        print_errors(args.input_topo_file, errors)
+        sys.exit(1)
 
-    print('\t Running commands on {}'.format(node_name))
-    subprocess.call([PY3_BIN, RUN_COMMAND_PY, '-ti', telnet_ip, '-tp',
-                     telnet_port, '-c', str(command)])
+    json_topo['project']['url'] = args.vm_ip
 
-    if res.json()['status'] == 'stopped':
-        stop_node(json_topo, node_name)
+    client = GNS3Client(json_topo['project']['url'], pool_size=max(args.workers, 1))
+
+    checkpoint = Checkpoint(args.input_topo_file, json_topo, every=args.checkpoint_every,
+                            interval=args.checkpoint_interval, journal=args.journal)
+    with checkpoint:
+        # Create project
+        with tracing.span('project'):
+            if 'project_id' not in json_topo['project']:
+                print('Creating GNS3 project...')
+                json_topo = client.create_project(json_topo)
+                checkpoint.save()
+            else:
+                client.set_project(json_topo['project']['project_id'])
+
+        print('GNS3 project created!')
+
+        # Create nodes and links
+        print('Creating GNS3 nodes and links...')
+        with tracing.span('plan') as span:
+            node_plan, link_plan = plan_build(json_topo)
+            span.args.update(nodes=len(node_plan), links=len(link_plan))
+
+        if args.computes:
+            # spread the nodes over several GNS3 computes; created nodes stay where they are
+            with tracing.span('placement'):
+                computes, weights = load_computes(args.computes)
+                pinned = created_pins(json_topo, node_plan, computes, args.vm_ip)
+                placement = place_nodes(node_plan, link_plan, computes, weights, pinned=pinned)
+                # pinned nodes keep the compute id they were created with ('local' included)
+                for name in placement:
+                    if name in pinned:
+                        node_plan[name]['compute_id'] = json_topo['gns3-nodes'][name].get('compute_id', 'local')
+                    else:
+                        node_plan[name]['compute_id'] = placement[name]
+                json_topo['computes'] = dict((compute.compute_id, compute.host) for compute in computes)
+            print_placement(computes, placement, link_plan)
+
+        restart_nodes = []
+        resized_nodes = []
+        with tracing.span('create') as span:
+            if args.reconcile:
+                # match the live project against the plan and apply only the difference
+                plan, created = reconcile(client, json_topo, node_plan, link_plan, workers=args.workers,
+                                          on_created=checkpoint.created, timeout=args.ready_timeout)
+                restart_nodes = plan.restart_nodes
+                resized_nodes = plan.resize_nodes
+            else:
+                created = create_all(json_topo, node_plan, link_plan, client.create_docker_node,
+                                     client.create_docker_link, workers=args.workers,
+                                     on_created=checkpoint.created)
+            span.args['created'] = len(created)
+        created_nodes = [name for (kind, name) in created if kind == 'node']
+        print('All GNS3 nodes and links created!')
+
+    # Bootstrap the OVS switches created or resized in this run, all consoles at once;
+    # other kept nodes were bootstrapped when they were created and keep their adapters
+    bootstrap_nodes = created_nodes + resized_nodes
+    batches = {}
+    for node in bootstrap_nodes:
+        if node.startswith('OVS'):
+            commands = [
+                'ovs-vsctl set-fail-mode br0 secure',
+                'ovs-vsctl set-controller br0 tcp:{}:6653'.format(CONTROLLER_OPENFLOW_ADDRESS),
+                'ovs-vsctl set bridge br0 other-config:datapath-id=00:00:00:00:00:00:00:01'
+            ]
+            # br0 holds exactly the adapters the node has
+            adapters = json_topo['gns3-nodes'][node]['properties']['adapters']
+            for i in range(adapters, OVS_IMAGE_PORTS):
+                commands.append('ovs-vsctl --if-exists del-port br0 eth{}'.format(i))
+            for i in range(OVS_IMAGE_PORTS, adapters):
+                commands.append('ovs-vsctl --may-exist add-port br0 eth{}'.format(i))
+            for i in range(1, 4):
+                commands.append('ovs-vsctl --if-exists del-br br{}'.format(i))
+            batches[node] = commands
+
+    # the global switch fabric only learns MACs, without a controller
+    for node in bootstrap_nodes:
+        if node.startswith('Switch'):
+            batches[node] = ['ovs-vsctl set-fail-mode br0 standalone']
+
+    # a failed console or command stops the build with a GNS3Error
+    if batches:
+        with tracing.span('bootstrap', nodes=len(batches)):
+            client.run_commands(json_topo, batches, timeout=args.ready_timeout)
+        print('All GNS3 switches bootstrapped!')
+
+    # nodes from earlier runs already went through the setup reboot
+    if created_nodes:
+        print('Performing a setup reboot...')
+        with tracing.span('reboot', nodes=len(created_nodes)):
+            waited = set_status(client, json_topo, sorted(created_nodes), 'started',
+                                timeout=args.ready_timeout)
+            print('\t All new nodes started after {:.1f}s'.format(waited))
+            waited = set_status(client, json_topo, sorted(created_nodes), 'stopped',
+                                timeout=args.ready_timeout)
+            print('\t All new nodes stopped after {:.1f}s'.format(waited))
+
+    print('Generating the network interface, BGP router and ONOS configs...')
+    with tracing.span('configs'):
+        configs = generate_configs(json_topo, render_workers=args.render_workers)
+        write_configs(configs)
+        write_atomic(args.input_topo_file, json_topo)
+        files = config_files(json_topo, configs)
+
+    # only push what changed since the last deploy into this project, to the compute of each node
+    with tracing.span('deploy') as span:
+        manifest = load_manifest(args.manifest)
+        hosts = compute_hosts(json_topo, args.vm_ip)
+        changed_nodes = set()
+        for host in sorted(set(hosts.values())):
+            host_files = [f for f in files if hosts[f[0]] == host]
+            to_push, changed, hashes = plan_deploy(manifest, json_topo['project']['project_id'],
+                                                   host_files, force=args.force_deploy)
+            print('Pushing {} of {} configs to {}...'.format(len(to_push), len(host_files), host))
+            if to_push:
+                print_stats(push_files(host, to_push))
+                record_deploy(args.manifest, manifest, json_topo['project']['project_id'], hashes)
+            changed_nodes |= changed
+        span.args['changed'] = len(changed_nodes)
+
+    # running nodes only pick up the new configs after a restart
+    with tracing.span('restart'):
+        statuses = client.node_statuses()
+        for node in sorted(changed_nodes | set(restart_nodes)):
+            if statuses.get(json_topo['gns3-nodes'][node]['node_id']) == 'started':
+                print('\t Restarting {}'.format(node))
+                client.reload_node(json_topo, node)
+    print('All interfaces and BGP routers of all GNS3 nodes configured!')
+
+    client.close()
 
 
 def main():
@@ -186,281 +196,40 @@ def main():
                         help='file with input AS-level topology description', required=True)
     parser.add_argument('-v', '--vm', dest='vm_ip', type=str,
                         help='GNS3 VM IP', default='192.168.163.132')
+    parser.add_argument('-w', '--workers', dest='workers', type=int,
+                        help='max concurrent GNS3 create requests', default=DEFAULT_WORKERS)
+    parser.add_argument('--checkpoint-every', dest='checkpoint_every', type=int,
+                        help='rewrite the topology file after this many created objects', default=DEFAULT_EVERY)
+    parser.add_argument('--checkpoint-interval', dest='checkpoint_interval', type=float,
+                        help='rewrite the topology file at least this often (seconds)', default=DEFAULT_INTERVAL)
+    parser.add_argument('--journal', dest='journal', action='store_true',
+                        help='journal every created object between topology file rewrites')
+    parser.add_argument('--ready-timeout', dest='ready_timeout', type=float,
+                        help='max seconds for each node to start or stop', default=DEFAULT_TIMEOUT)
+    parser.add_argument('--manifest', dest='manifest', type=str,
+                        help='file with the content hashes of the deployed configs', default=DEFAULT_MANIFEST)
+    parser.add_argument('--force-deploy', dest='force_deploy', action='store_true',
+                        help='push every config even if it did not change')
+    parser.add_argument('--render-workers', dest='render_workers', type=int,
+                        help='number of BGP config rendering processes', default=1)
+    parser.add_argument('--reconcile', dest='reconcile', action='store_true',
+                        help='diff the topology against the live GNS3 project and apply only the changes')
+    parser.add_argument('--computes', dest='computes', type=str,
+                        help='file with the GNS3 computes (and image weights) to spread the nodes over')
+    parser.add_argument('--trace', dest='trace', type=str,
+                        help='write the build spans to this file (.jsonl for JSON lines, else Chrome trace)')
     args = parser.parse_args()
 
-    with open(args.input_topo_file, 'r') as f:
-        json_topo = json.load(f)
-
-    json_topo['project']['url'] = args.vm_ip
-
-    # TODO: validate the json topo file!
-
-    # Create project
-    if 'project_id' not in json_topo['project']:
-        print('Creating GNS3 project...')
-        url = 'http://{}:3080/v2/projects'.format(json_topo['project']['url'])
-        payload = json.dumps({
-            'name': json_topo['project']['name']
-        })
-        headers = {}
-        res = requests.post(url, data=payload, headers=headers)
-        try:
-            json_res = res.json()
-            if 'project_id' in json_res:
-                json_topo['project']['project_id'] = json_res['project_id']
-                json_topo['project']['path'] = json_res['path']
-                json_topo['project']['filename'] = json_res['filename']
-            else:
-                raise
-        except:
-            print('Request to create GNS3 project {} failed with text:'.format(
-                json_topo['project']['name']))
-            pp(res.json())
-            sys.exit(1)
-
-        with open(args.input_topo_file, 'w') as f:
-            json.dump(json_topo, f, indent=2)
-
-    print('GNS3 project created!')
-
-    # Create nodes
-    print('Creating GNS3 nodes...')
-    if 'gns3-nodes' not in json_topo:
-        json_topo['gns3-nodes'] = {}
-
-    for node in sorted(json_topo['as-nodes'].keys()):
-        node_num = node.split('AS')[1]
-
-        # create host
-        as_host_name = 'H{}'.format(node_num)
-        print('\t Creating {}...'.format(as_host_name))
-        if as_host_name not in json_topo['gns3-nodes']:
-            json_topo = create_docker_node(
-                json_topo, name=as_host_name, image='gns3/endhost', adapters=1)
-            with open(args.input_topo_file, 'w') as f:
-                json.dump(json_topo, f, indent=2)
-        print('\t {} created!'.format(as_host_name))
-
-        # create router
-        as_router_name = 'R{}'.format(node_num)
-        print('\t Creating {}...'.format(as_router_name))
-        if as_router_name not in json_topo['gns3-nodes']:
-            json_topo = create_docker_node(
-                json_topo, name=as_router_name, image='ajnouri/quagga_alpine', adapters=5)
-            with open(args.input_topo_file, 'w') as f:
-                json.dump(json_topo, f, indent=2)
-        print('\t {} created!'.format(as_router_name))
-
-        if json_topo['as-nodes'][node]['SDN']:
-            # create OVS
-            as_ovs_name = 'OVS{}'.format(node_num)
-            print('\t Creating {}...'.format(as_ovs_name))
-            if as_ovs_name not in json_topo['gns3-nodes']:
-                json_topo = create_docker_node(
-                    json_topo, name=as_ovs_name, image='gns3/openvswitch', adapters=6)
-                with open(args.input_topo_file, 'w') as f:
-                    json.dump(json_topo, f, indent=2)
-            print('\t {} created!'.format(as_ovs_name))
-
-            commands = [
-                'ovs-vsctl set-fail-mode br0 secure',
-                'ovs-vsctl set-controller br0 tcp:1.0.0.1:6653',
-                'ovs-vsctl set bridge br0 other-config:datapath-id=00:00:00:00:00:00:00:01'
-            ]
-            for i in range(6, 16):
-                commands.append('ovs-vsctl del-port br0 eth{}'.format(i))
-            for i in range(1, 4):
-                commands.append('ovs-vsctl del-br br{}'.format(i))
-            run_command(json_topo, as_ovs_name, commands)
-
-            # create ONOS
-            as_onos_name = 'ONOS{}'.format(node_num)
-            print('\t Creating {}...'.format(as_onos_name))
-            if as_onos_name not in json_topo['gns3-nodes']:
-                json_topo = create_docker_node(
-                        json_topo, name=as_onos_name, image='onosproject/onos:1.12.0', adapters=3, start_command='cli')
-                with open(args.input_topo_file, 'w') as f:
-                    json.dump(json_topo, f, indent=2)
-            print('\t {} created!'.format(as_onos_name))
-
-        if json_topo['as-nodes'][node]['EXA']:
-            # create ExaBGP Monitor
-            as_exa_name = 'EXA{}'.format(node_num)
-            print('\t Creating {}...'.format(as_exa_name))
-            if as_exa_name not in json_topo['gns3-nodes']:
-                json_topo = create_docker_node(
-                    json_topo, name=as_exa_name, image='mavromat/exabgp-monitor', adapters=2,
-                    environment='LOCAL_IP=3.0.0.2\nLOCAL_AS={}\nREMOTE_IP=3.0.0.1'.format(node_num)
-                )
-                with open(args.input_topo_file, 'w') as f:
-                    json.dump(json_topo, f, indent=2)
-            print('\t {} created!'.format(as_exa_name))
-
-    # Create global switch
-    global_switch = 'Switch0'
-    print('\t Creating {}...'.format(global_switch))
-    if global_switch not in json_topo['gns3-nodes']:
-        json_topo = create_docker_node(
-            json_topo, name=global_switch, image='gns3/openvswitch', adapters=16)
-        with open(args.input_topo_file, 'w') as f:
-            json.dump(json_topo, f, indent=2)
-
-        run_command(json_topo, global_switch,
-                    ['ovs-vsctl set-fail-mode br0 standalone'])
-    print('\t {} created!'.format(global_switch))
-
-    print('All GNS3 nodes created!')
-
-    # Create links
-    print('Creating GNS3 links...')
-    if 'gns3-links' not in json_topo:
-        json_topo['gns3-links'] = {}
-
-    # initializing next available adapter counts to
-    next_av_adapter = {}
-    for node in json_topo['gns3-nodes']:
-        next_av_adapter[node] = 0
-
-    # Connecting Devices with OVS switches (internal)
-    for node in sorted(json_topo['as-nodes'].keys()):
-        node_num = node.split('AS')[1]
-
-        def connect_link_between(json_topo, node1, node2):
-            link_name = '{}:{}-{}:{}'.format(node1,
-                                             next_av_adapter[node1],
-                                             node2,
-                                             next_av_adapter[node2])
-            print('\t Connecting {}:{} with {}:{}...'.format(node1,
-                                                             next_av_adapter[node1],
-                                                             node2,
-                                                             next_av_adapter[node2]))
-            if link_name not in json_topo['gns3-links']:
-                json_topo = create_docker_link(json_topo,
-                                               src_hname=node1,
-                                               src_anum=next_av_adapter[node1],
-                                               dst_hname=node2,
-                                               dst_anum=next_av_adapter[node2])
-                with open(args.input_topo_file, 'w') as f:
-                    json.dump(json_topo, f, indent=2)
-            print('\t {}:{} with {}:{} connected!'.format(node1,
-                                                          next_av_adapter[node1],
-                                                          node2,
-                                                          next_av_adapter[node2]))
-            next_av_adapter[node1] += 1
-            next_av_adapter[node2] += 1
-
-        if json_topo['as-nodes'][node]['SDN']:
-            as_conn_name = 'OVS{}'.format(node_num)
-            next_av_adapter[as_conn_name] = 1
-
-            devices = []
-            onos_name = 'ONOS{}'.format(node_num)
-            devices.append(onos_name)
-            router_name = 'R{}'.format(node_num)
-            devices.append(router_name)
-            host_name = 'H{}'.format(node_num)
-            devices.append(host_name)
-
-            for device in devices:
-                connect_link_between(json_topo, as_conn_name, device)
-
-            # Connect ONOS with BGP Speaker
-            connect_link_between(json_topo, onos_name, router_name)
-
-            if json_topo['as-nodes'][node]['EXA']:
-                # Connect Monitor with BGP Speaker
-                exa_name = 'EXA{}'.format(node_num)
-                connect_link_between(json_topo, router_name, exa_name)
-
-                # Even IPs are ExaBGP Monitors
-                connect_link_between(json_topo, exa_name, 'Switch0')
-
-            # Connect ONOS and Monitors to a global switch (it will be a tunnel or other prefix in real world)
-            # Odd IPs are ONOS
-            connect_link_between(json_topo, onos_name, 'Switch0')
-        else:
-            as_host_name = 'H{}'.format(node_num)
-            as_conn_name = 'R{}'.format(node_num)
-
-            connect_link_between(json_topo, as_host_name, as_conn_name)
-
-            if json_topo['as-nodes'][node]['EXA']:
-                # Connect Monitor with BGP Speaker
-                exa_name = 'EXA{}'.format(node_num)
-                connect_link_between(json_topo, as_conn_name, exa_name)
-
-                # Even IPs are ExaBGP Monitors
-                connect_link_between(json_topo, exa_name, 'Switch0')
-
-    # Connecting AS routers with other AS routers (external)
-    for link in sorted(json_topo['as-links']):
-        (src_as, dst_as) = link.split('-')
-        src_as_num = src_as.split('AS')[1]
-        dst_as_num = dst_as.split('AS')[1]
-
-        if json_topo['as-nodes'][src_as]['SDN']:
-            src_router_name = 'OVS{}'.format(src_as_num)
-        else:
-            src_router_name = 'R{}'.format(src_as_num)
-
-        if json_topo['as-nodes'][dst_as]['SDN']:
-            dst_router_name = 'OVS{}'.format(dst_as_num)
-        else:
-            dst_router_name = 'R{}'.format(dst_as_num)
-
-        connect_link_between(json_topo, src_router_name, dst_router_name)
-    print('All GNS3 links created!')
-
-    print('Waiting for ~30 seconds for a setup reboot')
-    for node in sorted(json_topo['gns3-nodes']):
-        start_node(json_topo, node_name=node)
-    time.sleep(10)
-    for node in sorted(json_topo['gns3-nodes']):
-        stop_node(json_topo, node_name=node)
-    time.sleep(10)
-
-    print('Configuring the network interfaces of GNS3 nodes...')
-    subprocess.call([PY3_BIN, IFACE_PY, '-i',
-                     args.input_topo_file, '-o', DEFAULT_IFACE_CONFIGS_DIR])
-    for node in json_topo['gns3-nodes']:
-        cfg_file = '{}/{}_intf.cfg'.format(DEFAULT_IFACE_CONFIGS_DIR, node)
-        dest_file_path = '/opt/gns3/projects/{}/project-files/docker/{}/etc/network/interfaces'.format(
-            json_topo['project']['project_id'],
-            json_topo['gns3-nodes'][node]['node_id'])
-        subprocess.call([PY3_BIN, CP_PY, '-f', cfg_file, '-i',
-                         json_topo['project']['url'], '-p', dest_file_path])
-    print('All interfaces of all GNS3 nodes configured!')
-
-    print('Configuring the GNS3 BGP routers...')
-    subprocess.call([PY3_BIN, ROUTER_PY, '-i',
-                     args.input_topo_file, '-o', DEFAULT_ROUTER_CONFIGS_DIR])
-    for node in json_topo['gns3-nodes']:
-        if re.match('^R\d+$', node):
-            zebra_conf_file = '{}/zebra.conf'.format(
-                DEFAULT_ROUTER_CONFIGS_DIR)
-            dest_file_path = '/opt/gns3/projects/{}/project-files/docker/{}/etc/quagga/zebra.conf'.format(
-                json_topo['project']['project_id'],
-                json_topo['gns3-nodes'][node]['node_id'])
-            subprocess.call([PY3_BIN, CP_PY, '-f', zebra_conf_file,
-                             '-i', args.vm_ip, '-p', dest_file_path])
-
-            router_conf_file = '{}/{}_bgpd.conf'.format(
-                DEFAULT_ROUTER_CONFIGS_DIR, node)
-            dest_file_path = '/opt/gns3/projects/{}/project-files/docker/{}/etc/quagga/bgpd.conf'.format(
-                json_topo['project']['project_id'],
-                json_topo['gns3-nodes'][node]['node_id'])
-            subprocess.call([PY3_BIN, CP_PY, '-f', router_conf_file,
-                             '-i', args.vm_ip, '-p', dest_file_path])
-
-            disable_rp_filter_file = '{}/disable_rp_filter'.format(
-                DEFAULT_ROUTER_CONFIGS_DIR)
-            dest_file_path = '/opt/gns3/projects/{}/project-files/docker/{}/etc/network/if-up.d/disable_rp_filter'.format(
-                json_topo['project']['project_id'],
-                json_topo['gns3-nodes'][node]['node_id'])
-            subprocess.call([PY3_BIN, CP_PY, '-f', disable_rp_filter_file,
-                             '-i', args.vm_ip, '-p', dest_file_path])
-    time.sleep(5)
-    print('All GNS3 BGP routers configured!')
+    try:
+        build(args)
+    except (GNS3Error, ReadinessTimeout, TransferError, PlacementError) as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        tracing.print_summary()
+        if args.trace:
+            tracing.write_trace(args.trace)
+            print('Trace written to {}'.format(args.trace))
 
 
 if __name__ == '__main__':
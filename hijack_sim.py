@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from as_index import ASIndex
+from bgp_sim import PolicyGraph, propagate
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# the hijacker announces the victim's own prefix, or a more specific one (the /24 halves
+# of a /23 host prefix pass the 'ge 26' bogon filter of the generated configs)
+EXACT = 'exact'
+SUBPREFIX = 'subprefix'
+HIJACKS = (EXACT, SUBPREFIX)
+
+COLUMNS = ('hijacker', 'victim', 'hijack', 'polluted', 'ases', 'fraction')
+DEFAULT_SEED = 1
+
+
+class HijackError(Exception):
+    pass
+
+
+def parse_asn(value):
+    value = value.strip()
+    return int(value[2:] if value.upper().startswith('AS') else value)
+
+
+def read_pairs(path):
+    # [(hijacker ASN, victim ASN)] from a CSV file with hijacker,victim rows (header optional)
+    pairs = []
+    with open(path, 'r') as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#'):
+                continue
+            try:
+                pairs.append((parse_asn(row[0]), parse_asn(row[1])))
+            except (ValueError, IndexError):
+                if pairs:
+                    raise HijackError('bad pair {!r} in {}'.format(','.join(row), path))
+    return pairs
+
+
+def sample_pairs(asns, count, seed=DEFAULT_SEED):
+    # distinct random (hijacker, victim) pairs
+    asns = list(asns)
+    total = len(asns) * (len(asns) - 1)
+    if count >= total:
+        return [(a, b) for a in asns for b in asns if a != b]
+    rng = random.Random(seed)
+    pairs = set()
+    while len(pairs) < count:
+        (a, b) = rng.sample(asns, 2)
+        pairs.add((a, b))
+    return sorted(pairs)
+
+
+def exact_polluted(graph, hijacker, victim):
+    # ASes (the two origins left out) whose best route for the prefix leads to the hijacker
+    routes = propagate(graph, victim, rivals=(hijacker,))
+    return sum(1 for i in range(len(graph))
+               if routes.paths[i] is not None and routes.paths[i][-1] == hijacker and i != hijacker)
+
+
+def reachable(graph, hijacker):
+    # ASes that learn a prefix only the hijacker announces; longest match sends them all there
+    routes = propagate(graph, hijacker)
+    return set(i for i in range(len(graph)) if routes.pref[i] and i != hijacker)
+
+
+def hijack_rows(graph, hijacker, victims, hijacks):
+    # one row per (victim, hijack type) for one hijacker (positions); the sub-prefix
+    # outcome does not depend on the victim, so it is propagated once
+    ases = len(graph) - 2
+    rows = []
+    subprefix = reachable(graph, hijacker) if SUBPREFIX in hijacks else None
+    for victim in victims:
+        for hijack in hijacks:
+            if hijack == EXACT:
+                polluted = exact_polluted(graph, hijacker, victim)
+            else:
+                polluted = len(subprefix) - (1 if victim in subprefix else 0)
+            rows.append((graph.asns[hijacker], graph.asns[victim], hijack, polluted, ases,
+                         float(polluted) / ases if ases > 0 else 0.0))
+    return rows
+
+
+# per worker process, set by the pool initializer
+WORKER_ARGS = None
+
+
+def init_worker(graph, hijacks):
+    global WORKER_ARGS
+    WORKER_ARGS = (graph, hijacks)
+
+
+def hijack_job(job):
+    (graph, hijacks) = WORKER_ARGS
+    return hijack_rows(graph, job[0], job[1], hijacks)
+
+
+def evaluate(graph, as_index, pairs, hijacks=HIJACKS, workers=1):
+    # yields the rows of every pair, grouped by hijacker (in order of first appearance)
+    jobs = {}
+    for (hijacker, victim) in pairs:
+        if hijacker == victim:
+            raise HijackError('AS{} cannot hijack itself'.format(hijacker))
+        jobs.setdefault(as_index.position(hijacker), []).append(as_index.position(victim))
+    jobs = list(jobs.items())
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(graph, hijacks)) as executor:
+            for rows in executor.map(hijack_job, jobs, chunksize=max(1, len(jobs) // (workers * 8))):
+                for row in rows:
+                    yield row
+    else:
+        for (hijacker, victims) in jobs:
+            for row in hijack_rows(graph, hijacker, victims, hijacks):
+                yield row
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow(row[:5] + ('{:.6f}'.format(row[5]),))
+
+
+def write_parquet(path, rows):
+    if pyarrow is None:
+        raise HijackError('writing {} needs pyarrow, use a .csv output instead'.format(path))
+    columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    table = pyarrow.table(dict((name, list(values)) for (name, values) in zip(COLUMNS, columns)))
+    pyarrow.parquet.write_table(table, path)
+
+
+def print_summary(rows, elapsed):
+    print('Evaluated {} hijacks in {:.2f}s'.format(len(rows), elapsed))
+    for hijack in HIJACKS:
+        fractions = [row[5] for row in rows if row[2] == hijack]
+        if fractions:
+            print('\t {:<10} mean polluted {:.1%}, max {:.1%}'.format(hijack, sum(fractions) / len(fractions),
+                                                                      max(fractions)))
+    print('\t most impactful:')
+    for row in sorted(rows, key=lambda row: (-row[5], row[0], row[1]))[:5]:
+        print('\t\t AS{} -> AS{} ({}): {} ASes, {:.1%}'.format(row[0], row[1], row[2], row[3], row[5]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='estimate the impact of many BGP prefix hijacks at once')
+    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input AS-level topology description', required=True)
+    parser.add_argument('-p', '--pairs', dest='pairs', type=str, help='CSV file with hijacker,victim rows')
+    parser.add_argument('-n', '--random', dest='random', type=int, help='number of random hijacker/victim pairs (without --pairs)', default=1000)
+    parser.add_argument('--seed', dest='seed', type=int, help='seed of the random pairs', default=DEFAULT_SEED)
+    parser.add_argument('-t', '--types', dest='types', type=str, help='comma separated hijack types ({})'.format(', '.join(HIJACKS)), default=','.join(HIJACKS))
+    parser.add_argument('-o', '--output', dest='output', type=str, help='impact table (.csv or .parquet)', default='hijack_impact.csv')
+    parser.add_argument('-w', '--workers', dest='workers', type=int, help='number of simulation processes', default=1)
+    args = parser.parse_args()
+
+    hijacks = tuple(hijack.strip() for hijack in args.types.split(','))
+    for hijack in hijacks:
+        if hijack not in HIJACKS:
+            print('Unknown hijack type {}'.format(hijack))
+            sys.exit(1)
+
+    if args.output.endswith('.parquet') and pyarrow is None:
+        print('Writing {} needs pyarrow, use a .csv output instead'.format(args.output))
+        sys.exit(1)
+
+    with open(args.input_topo_file, 'r') as f:
+        json_topo = json.load(f)
+    as_index = ASIndex(json_topo)
+    graph = PolicyGraph(as_index)
+
+    start = time.time()
+    try:
+        pairs = read_pairs(args.pairs) if args.pairs else sample_pairs(as_index.asns, args.random, seed=args.seed)
+        rows = list(evaluate(graph, as_index, pairs, hijacks=hijacks, workers=args.workers))
+        if args.output.endswith('.parquet'):
+            write_parquet(args.output, rows)
+        else:
+            write_csv(args.output, rows)
+    except (HijackError, KeyError) as e:
+        print('Cannot evaluate the hijacks: {}'.format(e))
+        sys.exit(1)
+    elapsed = time.time() - start
+
+    print_summary(rows, elapsed)
+    print('Impact table written to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
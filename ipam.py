@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+
+import re
+import ipaddress
+from as_index import ASIndex, AS_LINK_RE
+
+
+# role -> pool the role's subnets are carved from; a prefixlen of 32 hands out
+# single addresses of one shared LAN instead of subnets
+DEFAULT_POOLS = {
+    'as-link': {'network': '5.0.0.0/8', 'prefixlen': 30},
+    'host': {'network': '10.0.0.0/8', 'prefixlen': 23},
+    'fabric': {'network': '100.0.0.0/16', 'prefixlen': 32}
+}
+
+# offset of the host address inside a host subnet, the gateway takes the first one
+HOST_OFFSET = 100
+
+
+class IPAMError(Exception):
+    pass
+
+
+def natural_key(key):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', key)]
+
+
+class Pool(object):
+    __slots__ = ('role', 'network', 'prefixlen', 'base', 'size', 'first', 'capacity')
+
+    def __init__(self, role, network, prefixlen):
+        self.role = role
+        try:
+            self.network = ipaddress.IPv4Network(network)
+        except ValueError as e:
+            raise IPAMError('bad {} pool {}: {}'.format(role, network, e))
+        if not self.network.prefixlen <= prefixlen <= 32:
+            raise IPAMError('bad {} pool {}: cannot carve /{} subnets'.format(role, network, prefixlen))
+        self.prefixlen = prefixlen
+        self.base = int(self.network.network_address)
+        self.size = 2 ** (32 - prefixlen)
+        # addresses of a LAN skip its network and broadcast addresses
+        self.first = 1 if prefixlen == 32 else 0
+        self.capacity = 2 ** (prefixlen - self.network.prefixlen) - 2 * self.first
+
+    def subnet(self, index):
+        # first address of the index-th subnet, as an integer
+        return self.base + index * self.size
+
+    def netmask(self):
+        # netmask of the subnets handed out, or of the LAN for single addresses
+        if self.prefixlen == 32:
+            return str(self.network.netmask)
+        return str(ipaddress.IPv4Network('0.0.0.0/{}'.format(self.prefixlen)).netmask)
+
+    def to_json(self):
+        return {'network': str(self.network), 'prefixlen': self.prefixlen}
+
+
+def format_address(value):
+    return str(ipaddress.IPv4Address(value))
+
+
+class IPAM(object):
+    # index allocations per role, kept in json_topo['ipam'] so a rerun hands every
+    # subnet back to the same key; new keys take the lowest free index
+
+    __slots__ = ('pools', 'allocations')
+
+    def __init__(self, json_topo, as_index=None):
+        if as_index is None:
+            as_index = ASIndex(json_topo)
+        state = json_topo.get('ipam', {})
+
+        self.pools = {}
+        for role in DEFAULT_POOLS:
+            spec = dict(DEFAULT_POOLS[role])
+            spec.update(state.get('pools', {}).get(role, {}))
+            self.pools[role] = Pool(role, spec['network'], spec['prefixlen'])
+        if self.pools['as-link'].prefixlen > 31:
+            raise IPAMError('as-link subnets must be /31 or larger')
+        if self.pools['host'].size <= HOST_OFFSET + 1:
+            raise IPAMError('host subnets of /{} cannot hold host address +{}'.format(
+                self.pools['host'].prefixlen, HOST_OFFSET))
+
+        as_links = set()
+        for as_link in json_topo['as-links']:
+            r = AS_LINK_RE.match(as_link)
+            if r:
+                as_links.add(as_link_key(int(r.group(1)), int(r.group(2))))
+        fabric = []
+        for asn in as_index.asns:
+            if as_index.is_sdn(asn):
+                # the subnet between the BGP speaker of an SDN AS and its OVS
+                as_links.add(as_link_key(asn, asn))
+                fabric.append('ONOS{}'.format(asn))
+            if as_index.is_exa(asn):
+                fabric.append('EXA{}'.format(asn))
+
+        old = state.get('allocations', {})
+        self.allocations = {
+            'as-link': self.assign('as-link', as_links, old.get('as-link', {})),
+            'host': self.assign('host', ['AS{}'.format(asn) for asn in as_index.asns], old.get('host', {})),
+            'fabric': self.assign('fabric', fabric, old.get('fabric', {}))
+        }
+
+        json_topo['ipam'] = self.to_json()
+
+    def assign(self, role, keys, old):
+        pool = self.pools[role]
+        keys = sorted(keys, key=natural_key)
+        if len(keys) > pool.capacity:
+            raise IPAMError('{} pool {} holds {} /{} subnets, {} needed'.format(
+                role, pool.network, pool.capacity, pool.prefixlen, len(keys)))
+
+        allocation = {}
+        for key in keys:
+            index = old.get(key)
+            if index is not None and pool.first <= index < pool.first + pool.capacity:
+                allocation[key] = index
+
+        used = set(allocation.values())
+        index = pool.first
+        for key in keys:
+            if key in allocation:
+                continue
+            while index in used:
+                index += 1
+            allocation[key] = index
+            used.add(index)
+
+        return allocation
+
+    def to_json(self):
+        return {
+            'pools': dict((role, self.pools[role].to_json()) for role in sorted(self.pools)),
+            'allocations': dict((role, dict((key, self.allocations[role][key])
+                                            for key in sorted(self.allocations[role], key=natural_key)))
+                                for role in sorted(self.allocations))
+        }
+
+    def as_link_address(self, this_as_num, other_as_num):
+        # address of this AS on the subnet it shares with the other one; the lower AS comes first
+        pool = self.pools['as-link']
+        first = pool.subnet(self.allocations['as-link'][as_link_key(this_as_num, other_as_num)])
+        if pool.prefixlen < 31:
+            first += 1
+        return format_address(first + (0 if this_as_num <= other_as_num else 1))
+
+    def as_link_netmask(self):
+        return self.pools['as-link'].netmask()
+
+    def host_subnet(self, as_num):
+        return self.pools['host'].subnet(self.allocations['host']['AS{}'.format(as_num)])
+
+    def host_prefix(self, as_num):
+        return '{}/{}'.format(format_address(self.host_subnet(as_num)), self.pools['host'].prefixlen)
+
+    def host_gateway(self, as_num):
+        return format_address(self.host_subnet(as_num) + 1)
+
+    def host_address(self, as_num):
+        return format_address(self.host_subnet(as_num) + HOST_OFFSET)
+
+    def host_netmask(self):
+        return self.pools['host'].netmask()
+
+    def fabric_address(self, node):
+        # address of an ONOS controller or ExaBGP monitor on the global switch fabric
+        pool = self.pools['fabric']
+        return format_address(pool.subnet(self.allocations['fabric'][node]))
+
+    def fabric_netmask(self):
+        return self.pools['fabric'].netmask()
+
+
+def as_link_key(src_as_num, dst_as_num):
+    return 'AS{}-AS{}'.format(min(src_as_num, dst_as_num), max(src_as_num, dst_as_num))
@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+
+import re
+import json
+from collections import OrderedDict, deque
+
+
+# estimated footprint of one container per image; unknown images take DEFAULT_WEIGHT
+DEFAULT_WEIGHTS = {
+    'gns3/endhost': {'memory': 32, 'cpu': 0.05},
+    'ajnouri/quagga_alpine': {'memory': 64, 'cpu': 0.1},
+    'gns3/openvswitch': {'memory': 64, 'cpu': 0.1},
+    'onosproject/onos:1.12.0': {'memory': 2048, 'cpu': 1.0},
+    'mavromat/exabgp-monitor': {'memory': 128, 'cpu': 0.1}
+}
+DEFAULT_WEIGHT = {'memory': 128, 'cpu': 0.1}
+
+# containers mostly idle, so CPUs may be shared; memory may not
+CPU_OVERCOMMIT = 4.0
+# a compute may drift this much from its fair share when that saves a cross-compute link
+IMBALANCE = 0.1
+REFINE_PASSES = 4
+
+# every node of an AS lives on the same compute, so only inter-AS and fabric links can cross
+AS_NODE_RE = re.compile(r'^(H|R|OVS|ONOS|EXA)(\d+)$')
+
+
+class PlacementError(Exception):
+    pass
+
+
+class Compute(object):
+    __slots__ = ('compute_id', 'host', 'memory', 'cpus', 'target', 'used_memory', 'used_cpu')
+
+    def __init__(self, compute_id, host, memory, cpus):
+        self.compute_id = compute_id
+        self.host = host
+        self.memory = memory
+        self.cpus = cpus
+        self.target = 0.0
+        self.used_memory = 0
+        self.used_cpu = 0.0
+
+    def fits(self, weight, limit=None):
+        memory = self.memory if limit is None else min(self.memory, limit)
+        return (self.used_memory + weight['memory'] <= memory and
+                self.used_cpu + weight['cpu'] <= self.cpus * CPU_OVERCOMMIT)
+
+    def add(self, weight, sign=1):
+        self.used_memory += sign * weight['memory']
+        self.used_cpu += sign * weight['cpu']
+
+
+def load_computes(path):
+    # {"computes": [{"compute_id", "host", "memory" (MB), "cpus"}], "weights": {image: {"memory", "cpu"}}}
+    with open(path, 'r') as f:
+        spec = json.load(f)
+
+    computes = []
+    for compute in spec['computes']:
+        computes.append(Compute(compute['compute_id'], compute['host'],
+                                compute['memory'], compute['cpus']))
+    if not computes:
+        raise PlacementError('no computes in {}'.format(path))
+
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(spec.get('weights', {}))
+    return computes, weights
+
+
+def created_pins(json_topo, node_plan, computes, local_host):
+    # created node -> compute it runs on, for place_nodes. Nodes of a project built without
+    # computes run on 'local', the compute at local_host; nodes on a compute missing from
+    # the computes are not pinned, they are placed like new ones
+    known = set(compute.compute_id for compute in computes)
+    local_ids = [compute.compute_id for compute in computes if compute.host == local_host]
+    pinned = {}
+    for (name, node) in json_topo.get('gns3-nodes', {}).items():
+        if name not in node_plan:
+            continue
+        compute_id = node.get('compute_id', 'local')
+        if compute_id == 'local' and compute_id not in known and local_ids:
+            compute_id = local_ids[0]
+        if compute_id not in known:
+            print('\t {} runs on compute {}, which is not in the computes, placing it anew'.format(
+                name, compute_id))
+            continue
+        pinned[name] = compute_id
+    return pinned
+
+
+def placement_unit(name):
+    r = AS_NODE_RE.match(name)
+    return 'AS{}'.format(r.group(2)) if r else name
+
+
+def place_nodes(node_plan, link_plan, computes, weights, pinned=None):
+    # Assign every planned node to a compute. Nodes are grouped into units (one per AS,
+    # one per fabric switch); units are streamed in BFS order and each goes to the compute
+    # holding most of its neighbors, discounted by how full that compute already is
+    # (linear deterministic greedy), then boundary units are moved while that removes
+    # cross-compute links. Pinned nodes (already created) keep their compute.
+    # Returns node name -> compute_id.
+    pinned = pinned or {}
+    by_id = OrderedDict((compute.compute_id, compute) for compute in computes)
+
+    units = OrderedDict()
+    unit_weight = {}
+    for name in node_plan:
+        unit = placement_unit(name)
+        units.setdefault(unit, []).append(name)
+        weight = weights.get(node_plan[name]['image'], DEFAULT_WEIGHT)
+        total = unit_weight.setdefault(unit, {'memory': 0, 'cpu': 0.0})
+        total['memory'] += weight['memory']
+        total['cpu'] += weight['cpu']
+
+    adjacency = dict((unit, {}) for unit in units)
+    for link in link_plan:
+        (src, dst) = (placement_unit(link[0]), placement_unit(link[2]))
+        if src != dst:
+            adjacency[src][dst] = adjacency[src].get(dst, 0) + 1
+            adjacency[dst][src] = adjacency[dst].get(src, 0) + 1
+
+    demand = sum(unit_weight[unit]['memory'] for unit in units)
+    capacity = sum(compute.memory for compute in computes)
+    if demand > capacity:
+        raise PlacementError('nodes need {} MB of memory, the computes have {} MB'.format(demand, capacity))
+    cpu_demand = sum(unit_weight[unit]['cpu'] for unit in units)
+    cpu_capacity = sum(compute.cpus * CPU_OVERCOMMIT for compute in computes)
+    if cpu_demand > cpu_capacity:
+        raise PlacementError('nodes need {:.1f} CPUs, the computes have {:.1f} with overcommit'.format(
+            cpu_demand, cpu_capacity))
+    for compute in computes:
+        compute.target = demand * float(compute.memory) / capacity
+        compute.used_memory = 0
+        compute.used_cpu = 0.0
+
+    assignment = {}
+    for unit in units:
+        for name in units[unit]:
+            if name in pinned:
+                if pinned[name] not in by_id:
+                    raise PlacementError('{} runs on unknown compute {}'.format(name, pinned[name]))
+                assignment[unit] = pinned[name]
+                by_id[pinned[name]].add(unit_weight[unit])
+                break
+
+    # BFS from the pinned units first, then from the heaviest unit of every other component
+    seeds = [unit for unit in units if unit in assignment]
+    seeds += sorted((unit for unit in units if unit not in assignment),
+                    key=lambda unit: -unit_weight[unit]['memory'])
+    order = []
+    seen = set()
+    for seed in seeds:
+        if seed in seen:
+            continue
+        seen.add(seed)
+        queue = deque([seed])
+        while queue:
+            unit = queue.popleft()
+            order.append(unit)
+            for neighb in sorted(adjacency[unit], key=lambda neighb: -adjacency[unit][neighb]):
+                if neighb not in seen:
+                    seen.add(neighb)
+                    queue.append(neighb)
+
+    for unit in order:
+        if unit in assignment:
+            continue
+        weight = unit_weight[unit]
+        links = {}
+        for neighb in adjacency[unit]:
+            if neighb in assignment:
+                links[assignment[neighb]] = links.get(assignment[neighb], 0) + adjacency[unit][neighb]
+
+        # computes past their share only take what fits nowhere else
+        best, best_score = None, None
+        for compute in computes:
+            if not compute.fits(weight):
+                continue
+            fill = compute.used_memory / compute.target if compute.target else 1.0
+            balanced = compute.fits(weight, limit=compute.target * (1 + IMBALANCE))
+            score = (balanced, links.get(compute.compute_id, 0) * max(0.0, 1.0 - fill), -fill)
+            if best_score is None or score > best_score:
+                best, best_score = compute, score
+        if best is None:
+            raise PlacementError('no compute has room for {} ({} MB, {:.1f} CPUs)'.format(
+                unit, weight['memory'], weight['cpu']))
+        assignment[unit] = best.compute_id
+        best.add(weight)
+
+    pinned_units = set(placement_unit(name) for name in pinned)
+    for _ in range(REFINE_PASSES):
+        moved = False
+        for unit in order:
+            if unit in pinned_units:
+                continue
+            links = {}
+            for neighb in adjacency[unit]:
+                links[assignment[neighb]] = links.get(assignment[neighb], 0) + adjacency[unit][neighb]
+            current = by_id[assignment[unit]]
+            if current.used_memory - unit_weight[unit]['memory'] < current.target * (1 - IMBALANCE):
+                continue
+            for compute_id in sorted(links, key=lambda compute_id: -links[compute_id]):
+                if links[compute_id] <= links.get(current.compute_id, 0):
+                    break
+                compute = by_id[compute_id]
+                if compute.fits(unit_weight[unit], limit=compute.target * (1 + IMBALANCE)):
+                    current.add(unit_weight[unit], -1)
+                    compute.add(unit_weight[unit])
+                    assignment[unit] = compute_id
+                    moved = True
+                    break
+        if not moved:
+            break
+
+    placement = OrderedDict()
+    for unit in units:
+        for name in units[unit]:
+            placement[name] = assignment[unit]
+    return placement
+
+
+def cross_links(link_plan, placement):
+    return [link for link in link_plan if placement[link[0]] != placement[link[2]]]
+
+
+def print_placement(computes, placement, link_plan):
+    print('\t Placement over {} computes, {} of {} links cross computes:'.format(
+        len(computes), len(cross_links(link_plan, placement)), len(link_plan)))
+    for compute in computes:
+        nodes = sum(1 for name in placement if placement[name] == compute.compute_id)
+        print('\t\t {} ({}): {} nodes, {}/{} MB, {:.1f}/{} CPUs'.format(
+            compute.compute_id, compute.host, nodes, compute.used_memory, compute.memory,
+            compute.used_cpu, compute.cpus))
+
+
+def compute_hosts(json_topo, default_host):
+    # node name -> host running its containers (console and config files live there)
+    hosts = json_topo.get('computes', {})
+    return dict((name, hosts.get(json_topo['gns3-nodes'][name].get('compute_id'), default_host))
+                for name in json_topo['gns3-nodes'])
@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+
+import time
+
+
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_POLL = 0.5
+
+
+class ReadinessTimeout(Exception):
+    pass
+
+
+def wait_for_status(client, json_topo, node_names, status, requested=None,
+                    timeout=DEFAULT_TIMEOUT, poll=DEFAULT_POLL):
+    # poll the project node list until every node reports status; each node has
+    # its own deadline, counted from when its start/stop was requested
+    start = time.time()
+    if requested is None:
+        requested = {}
+    deadlines = {}
+    for name in node_names:
+        deadlines[json_topo['gns3-nodes'][name]['node_id']] = (name, requested.get(name, start) + timeout)
+
+    pending = set(deadlines)
+    while pending:
+        statuses = client.node_statuses()
+        for node_id in list(pending):
+            if statuses.get(node_id) == status:
+                pending.remove(node_id)
+        if not pending:
+            break
+
+        now = time.time()
+        late = sorted(deadlines[node_id][0] for node_id in pending if deadlines[node_id][1] <= now)
+        if late:
+            raise ReadinessTimeout('nodes not {} after {:.0f}s: {}'.format(status, timeout, ', '.join(late)))
+        time.sleep(poll)
+
+    return time.time() - start
+
+
+def set_status(client, json_topo, node_names, status, timeout=DEFAULT_TIMEOUT, poll=DEFAULT_POLL):
+    # start or stop every node, then wait until all of them got there
+    action = client.start_node if status == 'started' else client.stop_node
+    requested = {}
+    for name in node_names:
+        action(json_topo, node_name=name)
+        requested[name] = time.time()
+    return wait_for_status(client, json_topo, node_names, status, requested=requested,
+                           timeout=timeout, poll=poll)
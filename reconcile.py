@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from gns3_client import trim_node, trim_link
+from create_engine import link_name, create_all, DEFAULT_WORKERS
+from readiness import set_status, DEFAULT_TIMEOUT
+
+
+# first adapter handed out per node type (eth0 of an AS OVS is not a data port)
+FIRST_ADAPTER = {
+    'OVS': 1
+}
+
+
+class ReconcileError(Exception):
+    pass
+
+
+class ReconcilePlan(object):
+    __slots__ = ('create_nodes', 'replace_nodes', 'resize_nodes', 'delete_nodes', 'keep_links',
+                 'create_links', 'delete_links', 'restart_nodes')
+
+    def __init__(self):
+        self.create_nodes = []
+        self.replace_nodes = []
+        self.resize_nodes = []
+        self.delete_nodes = []
+        self.keep_links = []
+        self.create_links = []
+        self.delete_links = []
+        self.restart_nodes = []
+
+    def is_empty(self):
+        return not (self.create_nodes or self.resize_nodes or self.delete_nodes or self.create_links or
+                    self.delete_links)
+
+    def print_summary(self):
+        print('\t Reconcile plan: {} nodes to create ({} replaced), {} to resize, {} to delete, '
+              '{} links to create, {} to delete, {} kept, {} nodes to restart'.format(
+                  len(self.create_nodes), len(self.replace_nodes), len(self.resize_nodes), len(self.delete_nodes),
+                  len(self.create_links), len(self.delete_links), len(self.keep_links),
+                  len(self.restart_nodes)))
+
+
+def node_type(name):
+    r = re.match(r'^([A-Za-z]+)\d+$', name)
+    return r.group(1) if r else name
+
+
+def live_state(client):
+    live_nodes = {}
+    names = {}
+    for node in client.list_nodes():
+        live_nodes[node['name']] = node
+        names[node['node_id']] = node['name']
+
+    live_links = []
+    for link in client.list_links():
+        ends = link['nodes']
+        if len(ends) != 2:
+            continue
+        live_links.append((names[ends[0]['node_id']], ends[0]['adapter_number'],
+                           names[ends[1]['node_id']], ends[1]['adapter_number'], link))
+
+    return live_nodes, live_links
+
+
+def node_differs(live_node, spec):
+    props = live_node['properties']
+    image = spec['image'] if ':' in spec['image'] else '{}:latest'.format(spec['image'])
+    # the adapters are not compared: a node short of adapters is resized in place
+    return (props['image'] != image or
+            props.get('environment') != spec.get('environment') or
+            props.get('start_command') != spec.get('start_command') or
+            live_node.get('compute_id') != spec.get('compute_id', 'local'))
+
+
+def link_key(node1, node2):
+    return (min(node1, node2), max(node1, node2))
+
+
+def compute_plan(node_plan, link_plan, live_nodes, live_links):
+    plan = ReconcilePlan()
+
+    for name in live_nodes:
+        if name not in node_plan:
+            plan.delete_nodes.append(name)
+    for name in node_plan:
+        if name not in live_nodes:
+            plan.create_nodes.append(name)
+        elif node_differs(live_nodes[name], node_plan[name]):
+            plan.replace_nodes.append(name)
+            plan.create_nodes.append(name)
+        elif live_nodes[name]['properties']['adapters'] < node_plan[name]['adapters']:
+            plan.resize_nodes.append(name)
+
+    # links of deleted or replaced nodes go away together with the node
+    gone = set(plan.delete_nodes) | set(plan.replace_nodes)
+    live_by_key = {}
+    for live_link in live_links:
+        if live_link[0] in gone or live_link[2] in gone:
+            continue
+        live_by_key.setdefault(link_key(live_link[0], live_link[2]), []).append(live_link)
+
+    # a desired link is kept if any live link joins the same two nodes, whatever its adapters
+    missing = []
+    for link in link_plan:
+        candidates = live_by_key.get(link_key(link[0], link[2]))
+        if candidates:
+            plan.keep_links.append(candidates.pop(0))
+        else:
+            missing.append(link)
+    for key in sorted(live_by_key):
+        plan.delete_links.extend(live_by_key[key])
+
+    used = {}
+    for link in plan.keep_links:
+        used.setdefault(link[0], set()).add(link[1])
+        used.setdefault(link[2], set()).add(link[3])
+
+    def free_adapter(node, preferred):
+        taken = used.setdefault(node, set())
+        if preferred not in taken:
+            return preferred
+        adapters = node_plan[node]['adapters']
+        if node in live_nodes and node not in gone:
+            adapters = max(adapters, live_nodes[node]['properties']['adapters'])
+        for adapter in range(FIRST_ADAPTER.get(node_type(node), 0), adapters):
+            if adapter not in taken:
+                return adapter
+        raise ReconcileError('no free adapter left on {}'.format(node))
+
+    # prefer the adapters of a fresh build so untouched nodes keep their interface names
+    for link in missing:
+        src_anum = free_adapter(link[0], link[1])
+        used[link[0]].add(src_anum)
+        dst_anum = free_adapter(link[2], link[3])
+        used[link[2]].add(dst_anum)
+        plan.create_links.append((link[0], src_anum, link[2], dst_anum))
+
+    touched = set()
+    for link in plan.create_links + plan.delete_links:
+        touched.add(link[0])
+        touched.add(link[2])
+    plan.restart_nodes = sorted(name for name in touched if name in live_nodes and name not in gone)
+
+    return plan
+
+
+def resize_nodes(client, json_topo, names, node_plan, workers=DEFAULT_WORKERS):
+    # give kept nodes the adapters their new links need
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        nodes = list(executor.map(lambda name: client.update_node(json_topo['gns3-nodes'][name]['node_id'], {
+            'adapters': node_plan[name]['adapters']
+        }), names))
+    for (name, node) in zip(names, nodes):
+        print('\t {} resized to {} adapters'.format(name, node['properties']['adapters']))
+        json_topo['gns3-nodes'][name] = node
+
+
+def apply_plan(client, json_topo, plan, node_plan, live_nodes, workers=DEFAULT_WORKERS, on_created=None,
+               timeout=DEFAULT_TIMEOUT):
+    # deletes first, links before nodes, then resize the kept nodes short of adapters
+    # and create the rest through the creation engine
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(client.delete_link, [link[4]['link_id'] for link in plan.delete_links]))
+        list(executor.map(client.delete_node, [live_nodes[name]['node_id']
+                                               for name in plan.delete_nodes + plan.replace_nodes]))
+
+    # adapters only change on stopped nodes; running ones are started again once linked
+    running = [name for name in plan.resize_nodes if live_nodes[name]['status'] == 'started']
+
+    gone = set(plan.delete_nodes) | set(plan.replace_nodes)
+    json_topo['gns3-nodes'] = {}
+    for name in node_plan:
+        if name in live_nodes and name not in gone:
+            json_topo['gns3-nodes'][name] = trim_node(live_nodes[name])
+    json_topo['gns3-links'] = {}
+    for link in plan.keep_links:
+        json_topo['gns3-links'][link_name(link[:4])] = trim_link(link[4])
+
+    if running:
+        set_status(client, json_topo, running, 'stopped', timeout=timeout)
+    if plan.resize_nodes:
+        resize_nodes(client, json_topo, plan.resize_nodes, node_plan, workers=workers)
+
+    created = create_all(json_topo, node_plan, plan.create_links, client.create_docker_node,
+                         client.create_docker_link, workers=workers, on_created=on_created)
+    if running:
+        set_status(client, json_topo, running, 'started', timeout=timeout)
+    return created
+
+
+def reconcile(client, json_topo, node_plan, link_plan, workers=DEFAULT_WORKERS, on_created=None,
+              timeout=DEFAULT_TIMEOUT):
+    live_nodes, live_links = live_state(client)
+    plan = compute_plan(node_plan, link_plan, live_nodes, live_links)
+    plan.print_summary()
+    created = apply_plan(client, json_topo, plan, node_plan, live_nodes, workers=workers,
+                         on_created=on_created, timeout=timeout)
+    return plan, created
@@ -1,10 +1,11 @@
 #!/usr/bin/python3
 
 
+import sys
 import argparse
-import telnetlib
-import time
 import ast
+from console import ConsoleManager, ConsoleError, DEFAULT_TIMEOUT
+import tracing
 
 
 def main():
@@ -16,19 +17,29 @@ def main():
                         type=int, help='telnet port', required=True)
     parser.add_argument('-c', '--command', dest='command',
                         type=str, help='command to run', required=True)
+    parser.add_argument('-t', '--timeout', dest='timeout', type=float,
+                        help='seconds to wait for the prompt', default=DEFAULT_TIMEOUT)
+    parser.add_argument('--trace', dest='trace', type=str,
+                        help='write the console spans to this file (.jsonl for JSON lines, else Chrome trace)')
     args = parser.parse_args()
 
-    tn = telnetlib.Telnet(args.tip, args.tport)
-    tn.write('\n'.encode('ascii'))
-    time.sleep(1)
-    tn.read_until('#'.encode('ascii'))
-
     x = ast.literal_eval(args.command)
-    for cmd in x:
-        tn.write('{}\n'.format(cmd).encode('ascii'))
-        tn.read_until('#'.encode('ascii'))
-
-    tn.close()
+    consoles = ConsoleManager(args.tip, timeout=args.timeout)
+    try:
+        results = consoles.run(args.tport, x)
+    except ConsoleError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        consoles.close()
+        if args.trace:
+            tracing.write_trace(args.trace)
+
+    for result in results:
+        if result.output:
+            print(result.output)
+    if any(result.status != 0 for result in results):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+
+import json
+import time
+import threading
+import contextlib
+
+
+# span kinds
+PHASE = 'phase'
+REST = 'rest'
+CONSOLE = 'console'
+PUSH = 'push'
+KINDS = (PHASE, REST, CONSOLE, PUSH)
+
+
+class Span(object):
+    __slots__ = ('name', 'kind', 'start', 'duration', 'lane', 'failed', 'args')
+
+    def __init__(self, name, kind, start, lane, args):
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.duration = 0.0
+        self.lane = lane
+        self.failed = False
+        self.args = args
+
+    def to_json(self, origin):
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'start': round(self.start - origin, 6),
+            'duration': round(self.duration, 6),
+            'lane': self.lane,
+            'failed': self.failed,
+            'args': self.args
+        }
+
+
+class Tracer(object):
+    # collects finished spans from every thread (and the console event loop) of a run
+
+    def __init__(self):
+        self.origin = time.time()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def record(self, name, kind, start, duration, failed=False, lane=None, **args):
+        span = Span(name, kind, start, lane or threading.current_thread().name, args)
+        span.duration = duration
+        span.failed = failed
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name, kind=PHASE, lane=None, **args):
+        # the span is yielded so the caller can add args or mark it failed;
+        # leaving it with an exception marks it failed too
+        span = Span(name, kind, time.time(), lane or threading.current_thread().name, args)
+        try:
+            yield span
+        except BaseException:
+            span.failed = True
+            raise
+        finally:
+            span.duration = time.time() - span.start
+            with self.lock:
+                self.spans.append(span)
+
+    def summary(self):
+        # [(kind, name, count, total seconds, max seconds, failures)]: phases in the order
+        # they ran, everything else by total time
+        rows = {}
+        first = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            row = rows.setdefault((span.kind, span.name), [0, 0.0, 0.0, 0])
+            row[0] += 1
+            row[1] += span.duration
+            row[2] = max(row[2], span.duration)
+            if span.failed:
+                row[3] += 1
+            first[(span.kind, span.name)] = min(first.get((span.kind, span.name), span.start), span.start)
+
+        def order(key):
+            kind = KINDS.index(key[0]) if key[0] in KINDS else len(KINDS)
+            return (kind, first[key] if key[0] == PHASE else -rows[key][1], key[1])
+
+        return [(key[0], key[1]) + tuple(rows[key]) for key in sorted(rows, key=order)]
+
+    def print_summary(self):
+        print('Trace summary:')
+        print('\t {:<8} {:<24} {:>7} {:>10} {:>9} {:>9} {:>7}'.format(
+            'kind', 'name', 'count', 'total (s)', 'avg (ms)', 'max (ms)', 'failed'))
+        for (kind, name, count, total, longest, failures) in self.summary():
+            print('\t {:<8} {:<24} {:>7} {:>10.2f} {:>9.1f} {:>9.1f} {:>7}'.format(
+                kind, name, count, total, 1000 * total / count, 1000 * longest, failures))
+
+    def write_jsonl(self, path):
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        with open(path, 'w') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_json(self.origin)) + '\n')
+
+    def write_chrome(self, path):
+        # Chrome trace event format (chrome://tracing, Perfetto): one complete event per span,
+        # one track per thread or console
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        lanes = {}
+        events = []
+        for span in spans:
+            if span.lane not in lanes:
+                lanes[span.lane] = len(lanes) + 1
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': lanes[span.lane],
+                               'args': {'name': span.lane}})
+            args = dict(span.args)
+            if span.failed:
+                args['failed'] = True
+            events.append({
+                'name': span.name,
+                'cat': span.kind,
+                'ph': 'X',
+                'ts': int(1e6 * (span.start - self.origin)),
+                'dur': int(1e6 * span.duration),
+                'pid': 1,
+                'tid': lanes[span.lane],
+                'args': args
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def write_trace(self, path):
+        # .jsonl files get one span per line, anything else a Chrome trace
+        if path.endswith('.jsonl'):
+            self.write_jsonl(path)
+        else:
+            self.write_chrome(path)
+
+
+# one tracer per process, shared by the client, consoles and file pushes
+TRACER = Tracer()
+span = TRACER.span
+record = TRACER.record
+print_summary = TRACER.print_summary
+write_trace = TRACER.write_trace
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+import io
+import time
+import tarfile
+import subprocess
+import tracing
+try:
+    import paramiko
+except ImportError:
+    paramiko = None
+
+
+USER = 'gns3'
+PASS = 'gns3'
+UNTAR_COMMAND = 'tar -xf - -C /'
+
+
+class TransferError(Exception):
+    pass
+
+
+def build_bundle(files):
+    # files: [(content, absolute remote path, mode)] -> one tar stream rooted at /
+    now = time.time()
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w') as tar:
+        for (content, remote_path, mode) in files:
+            if not isinstance(content, bytes):
+                content = content.encode('utf-8')
+            info = tarfile.TarInfo(remote_path.lstrip('/'))
+            info.size = len(content)
+            info.mode = mode
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(content))
+    return buf.getvalue()
+
+
+def send_paramiko(server_ip, bundle):
+    ssh = paramiko.SSHClient()
+    ssh.load_system_host_keys()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        ssh.connect(server_ip, username=USER, password=PASS)
+        stdin, stdout, stderr = ssh.exec_command(UNTAR_COMMAND)
+        stdin.write(bundle)
+        stdin.channel.shutdown_write()
+        if stdout.channel.recv_exit_status() != 0:
+            raise TransferError('remote untar failed: {}'.format(stderr.read().decode('utf-8', 'replace')))
+    except (paramiko.SSHException, OSError) as e:
+        raise TransferError('cannot push to {}: {}'.format(server_ip, e))
+    finally:
+        ssh.close()
+
+
+def send_sshpass(server_ip, bundle):
+    try:
+        res = subprocess.run(['sshpass', '-p', PASS, 'ssh', '{}@{}'.format(USER, server_ip), UNTAR_COMMAND],
+                             input=bundle, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise TransferError('cannot run sshpass (install it, or paramiko): {}'.format(e))
+    if res.returncode != 0:
+        raise TransferError('remote untar failed: {}'.format(res.stderr.decode('utf-8', 'replace')))
+
+
+def push_files(server_ip, files):
+    # one authenticated connection and one tar stream for every file
+    start = time.time()
+    with tracing.span('push', tracing.PUSH, host=server_ip, files=len(files)) as span:
+        bundle = build_bundle(files)
+        span.args['bytes'] = len(bundle)
+        if paramiko is not None:
+            send_paramiko(server_ip, bundle)
+        else:
+            send_sshpass(server_ip, bundle)
+    elapsed = max(time.time() - start, 1e-6)
+
+    return {
+        'files': len(files),
+        'bytes': len(bundle),
+        'seconds': elapsed
+    }
+
+
+def print_stats(stats):
+    print('\t Pushed {} files ({} bytes) in {:.2f}s: {:.1f} files/s, {:.1f} KB/s'.format(
+        stats['files'], stats['bytes'], stats['seconds'],
+        stats['files'] / stats['seconds'], stats['bytes'] / 1024.0 / stats['seconds']))
@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+
+import sys
+import json
+import argparse
+from as_index import AS_RE, AS_LINK_RE
+from ipam import IPAM, IPAMError, natural_key
+from create_engine import plan_build, AdapterError, MAX_ADAPTERS
+
+
+RELS = ('c2p', 'p2p', 'p2c')
+BACKUPS = ('yes', 'no')
+
+# the BGP configs tag routes with <asn>:<value> standard communities, whose halves are 16 bit
+MIN_ASN = 1
+MAX_ASN = 65535
+
+
+def check_nodes(json_topo, errors):
+    # AS number -> node, for the nodes that are well formed
+    ases = {}
+    for node in sorted(json_topo['as-nodes'], key=natural_key):
+        r = AS_RE.match(node)
+        if not r:
+            errors.append('node {!r}: name is not AS<number>'.format(node))
+            continue
+        asn = int(r.group(1))
+        if not MIN_ASN <= asn <= MAX_ASN:
+            errors.append('node {}: AS number outside {}-{} (BGP communities)'.format(node, MIN_ASN, MAX_ASN))
+        if asn in ases:
+            errors.append('node {}: same AS number as {}'.format(node, ases[asn]))
+            continue
+        attrs = json_topo['as-nodes'][node]
+        if not isinstance(attrs, dict):
+            errors.append('node {}: attributes are not an object'.format(node))
+            continue
+        for flag in ('SDN', 'EXA'):
+            if not isinstance(attrs.get(flag), bool):
+                errors.append('node {}: {} must be true or false'.format(node, flag))
+        ases[asn] = node
+    return ases
+
+
+def check_links(json_topo, ases, errors):
+    # the links that are well formed
+    links = []
+    pairs = {}
+    for link in sorted(json_topo['as-links'], key=natural_key):
+        r = AS_LINK_RE.match(link)
+        if not r:
+            errors.append('link {!r}: name is not AS<number>-AS<number>'.format(link))
+            continue
+        src_as_num = int(r.group(1))
+        dst_as_num = int(r.group(2))
+        attrs = json_topo['as-links'][link]
+        if not isinstance(attrs, dict):
+            errors.append('link {}: attributes are not an object'.format(link))
+            continue
+
+        ok = True
+        for asn in (src_as_num, dst_as_num):
+            if asn not in ases:
+                errors.append('link {}: unknown AS{}'.format(link, asn))
+                ok = False
+        if src_as_num == dst_as_num:
+            errors.append('link {}: an AS cannot link to itself'.format(link))
+            ok = False
+        if attrs.get('rel') not in RELS:
+            errors.append('link {}: rel {!r} is not one of {}'.format(link, attrs.get('rel'), ', '.join(RELS)))
+            ok = False
+        if attrs.get('backup') not in BACKUPS:
+            errors.append('link {}: backup {!r} is not one of {}'.format(link, attrs.get('backup'),
+                                                                      ', '.join(BACKUPS)))
+            ok = False
+        elif attrs['backup'] == 'yes' and attrs.get('rel') != 'c2p':
+            errors.append('link {}: backup links must be c2p, customer first'.format(link))
+            ok = False
+
+        # both directions of one pair would get two router links on the same subnet
+        pair = (min(src_as_num, dst_as_num), max(src_as_num, dst_as_num))
+        if pair in pairs:
+            errors.append('link {}: conflicts with link {}'.format(link, pairs[pair]))
+            continue
+        pairs[pair] = link
+        if ok:
+            links.append(link)
+    return links
+
+
+def check_pools(json_topo, ases, links, errors):
+    # allocate every subnet the way the build will (pool overrides and earlier allocations
+    # kept in the topology included), on a copy of the well formed part of the topology;
+    # this covers the host prefixes and fabric addresses the ONOS and ExaBGP configs use
+    topo = {
+        'as-nodes': dict((ases[asn], {'SDN': json_topo['as-nodes'][ases[asn]].get('SDN') is True,
+                                      'EXA': json_topo['as-nodes'][ases[asn]].get('EXA') is True})
+                         for asn in ases),
+        'as-links': dict((link, json_topo['as-links'][link]) for link in links),
+        'ipam': json_topo.get('ipam', {})
+    }
+    try:
+        IPAM(topo)
+    except IPAMError as e:
+        errors.append(str(e))
+
+
+def check_adapters(json_topo, errors):
+    # every node of the build plan must fit its links on the adapters of a docker node
+    try:
+        plan_build(json_topo)
+    except AdapterError as e:
+        for node in sorted(e.needed, key=natural_key):
+            errors.append('node {}: its links need {} adapters, docker nodes take at most {}'.format(
+                node, e.needed[node], MAX_ADAPTERS))
+
+
+def validate(json_topo):
+    # every error of the topology, in one pass over its nodes and links
+    errors = []
+    for key in ('project', 'as-nodes', 'as-links'):
+        if not isinstance(json_topo.get(key), dict):
+            errors.append('missing {} object'.format(key))
+    if errors:
+        return errors
+
+    ases = check_nodes(json_topo, errors)
+    links = check_links(json_topo, ases, errors)
+    check_pools(json_topo, ases, links, errors)
+
+    # the build plan reads the nodes and links as they are, so it only runs on a sound topology
+    if not errors:
+        check_adapters(json_topo, errors)
+    return errors
+
+
+def print_errors(path, errors):
+    print('{}: {} errors'.format(path, len(errors)))
+    for error in errors:
+        print('\t {}'.format(error))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='check an AS-level topology before building it')
+    parser.add_argument('-i', '--input', dest='input_topo_file', type=str, help='file with input AS-level topology description', required=True)
+    args = parser.parse_args()
+
+    try:
+        with open(args.input_topo_file, 'r') as f:
+            json_topo = json.load(f)
+    except ValueError as e:
+        print_errors(args.input_topo_file, ['not valid JSON: {}'.format(e)])
+        sys.exit(1)
+    if not isinstance(json_topo, dict):
+        print_errors(args.input_topo_file, ['not a JSON object'])
+        sys.exit(1)
+
+    errors = validate(json_topo)
+    if errors:
+        print_errors(args.input_topo_file, errors)
+        sys.exit(1)
+    print('{}: {} ASes and {} links, no errors'.format(args.input_topo_file, len(json_topo['as-nodes']),
+                                                       len(json_topo['as-links'])))
+
+
+if __name__ == '__main__':
+    main()